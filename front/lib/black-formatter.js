@@ -1,98 +1,126 @@
+import { acquirePackages, releasePackages } from './pyodide-runtime.js';
+
 let pyodide = null;
-let isBlackInitialized = false;
+let initialization = null; // Promise of the initialized runtime, shared by concurrent first calls
 
-// Load Pyodide from CDN dynamically
-async function loadPyodideFromCDN() {
-  // Check if loadPyodide is already available globally
-  if (typeof window !== 'undefined' && window.loadPyodide) {
-    return window.loadPyodide;
-  }
+// Defined once at initialization, then called with the code and options as arguments,
+// so that no Python source is generated (and compiled) per call
+const BLACK_FUNCTIONS = `
+import black
 
-  // Load Pyodide script from CDN
-  return new Promise((resolve, reject) => {
-    const script = document.createElement('script');
-    script.src = 'https://cdn.jsdelivr.net/pyodide/v0.28.2/full/pyodide.js';
-    script.onload = () => {
-      if (window.loadPyodide) {
-        resolve(window.loadPyodide);
-      } else {
-        reject(new Error('loadPyodide not found after loading script'));
-      }
-    };
-    script.onerror = () => reject(new Error('Failed to load Pyodide from CDN'));
-    document.head.appendChild(script);
-  });
-}
+def format_with_black(code, line_length, string_normalization, target_versions):
+    try:
+        # Configure Black mode, no target versions meaning Black infers them per file
+        mode = black.Mode(
+            target_versions={black.TargetVersion[name] for name in target_versions},
+            line_length=line_length,
+            string_normalization=string_normalization,
+        )
+        formatted = black.format_str(code, mode=mode)
+        return {
+            'success': True,
+            'formatted': formatted,
+            'changed': formatted != code,
+            'original': code
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'formatted': code,
+            'changed': False
+        }
+
+def check_black_compatibility(code):
+    try:
+        formatted = black.format_str(code, mode=black.Mode())
+        # Check if it's already Black-compliant
+        is_compliant = formatted == code
+        return {
+            'success': True,
+            'isCompliant': is_compliant,
+            'formatted': formatted,
+            'original': code,
+            'changes': not is_compliant
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'isCompliant': False
+        }
+`;
+
+let formatWithBlackFunction = null;
+let checkBlackCompatibilityFunction = null;
 
-export async function initializeBlack() {
-  if (!isBlackInitialized) {
-    console.log('🔄 Loading Pyodide WASM environment from CDN...');
+async function setUpBlack() {
+  console.log('📦 Installing Black formatter...');
+  pyodide = await acquirePackages('black', ['black']);
 
-    const loadPyodide = await loadPyodideFromCDN();
+  // Own namespace, so that the helpers don't leak into the interpreter's __main__ globals
+  const namespace = pyodide.toPy({});
+  pyodide.runPython(BLACK_FUNCTIONS, { globals: namespace });
+  formatWithBlackFunction = namespace.get('format_with_black');
+  checkBlackCompatibilityFunction = namespace.get('check_black_compatibility');
+  namespace.destroy();
 
-    pyodide = await loadPyodide({
-      indexURL: "https://cdn.jsdelivr.net/pyodide/v0.28.2/full/"
+  console.log('🐍 Black Python formatter initialized!');
+  return pyodide;
+}
+
+export function initializeBlack() {
+  if (!initialization) {
+    const pending = (initialization = setUpBlack());
+    // A failed initialization can be retried by the next call
+    pending.catch(() => {
+      if (initialization === pending) initialization = null;
     });
+  }
+  return initialization;
+}
 
-    console.log('📦 Installing Black formatter...');
-    await pyodide.loadPackage("micropip");
-    await pyodide.runPythonAsync(`
-      import micropip
-      await micropip.install("black")
-      import black
-      print("✅ Black formatter loaded successfully!")
-    `);
-
-    isBlackInitialized = true;
-    console.log('🐍 Black Python formatter initialized!');
+// Release Black's packages in the shared runtime, the next call initializing it again
+export async function releaseBlack() {
+  if (initialization) {
+    const pending = initialization;
+    initialization = null;
+    try {
+      await pending;
+    } catch {
+      return;
+    }
+    // Initialized again in the meantime, by a call made while this one was waiting
+    if (initialization) return;
+    formatWithBlackFunction.destroy();
+    checkBlackCompatibilityFunction.destroy();
+    formatWithBlackFunction = checkBlackCompatibilityFunction = null;
+    pyodide = null;
+    await releasePackages('black');
+  }
+}
+
+// Call a Python helper, converting its result dict and releasing the proxy
+function callPython(pythonFunction, ...args) {
+  const proxy = pythonFunction(...args);
+  try {
+    return proxy.toJs({ dict_converter: Object.fromEntries });
+  } finally {
+    proxy.destroy();
   }
-  return pyodide;
 }
 
 export async function formatWithBlack(pythonCode, options = {}) {
   try {
-    const py = await initializeBlack();
+    await initializeBlack();
 
     // Set up Black formatting options
     const lineLength = options.lineLength || 88;
     const stringNormalization = options.skipStringNormalization ? false : true; // Inverted logic
+    // black.TargetVersion names, e.g. ['PY39']
+    const targetVersions = options.targetVersions || [];
 
-    // Create Python code to format the input
-    const formattingScript = `
-import black
-import sys
-
-# Input code
-code = """${pythonCode.replace(/"""/g, '\\"""')}"""
-
-try:
-    # Configure Black mode
-    mode = black.Mode(
-        line_length=${lineLength},
-        string_normalization=${stringNormalization ? 'True' : 'False'}
-    )
-
-    # Format the code
-    formatted = black.format_str(code, mode=mode)
-
-    result = {
-        'success': True,
-        'formatted': formatted,
-        'changed': formatted != code,
-        'original': code
-    }
-except Exception as e:
-    result = {
-        'success': False,
-        'error': str(e),
-        'formatted': code,
-        'changed': False
-    }
-
-result
-`;
-
-    const result = py.runPython(formattingScript).toJs({ dict_converter: Object.fromEntries });
+    const result = callPython(formatWithBlackFunction, pythonCode, lineLength, stringNormalization, targetVersions);
 
     console.log(`🖤 Black formatting ${result.success ? 'successful' : 'failed'}`);
     return result;
@@ -110,38 +138,9 @@ result
 
 export async function checkBlackCompatibility(pythonCode) {
   try {
-    const py = await initializeBlack();
-
-    const checkScript = `
-import black
-
-code = """${pythonCode.replace(/"""/g, '\\"""')}"""
-
-try:
-    # Format with Black
-    formatted = black.format_str(code, mode=black.Mode())
-
-    # Check if it's already Black-compliant
-    is_compliant = formatted == code
-
-    result = {
-        'success': True,
-        'isCompliant': is_compliant,
-        'formatted': formatted,
-        'original': code,
-        'changes': not is_compliant
-    }
-except Exception as e:
-    result = {
-        'success': False,
-        'error': str(e),
-        'isCompliant': False
-    }
-
-result
-`;
+    await initializeBlack();
 
-    const result = py.runPython(checkScript).toJs({ dict_converter: Object.fromEntries });
+    const result = callPython(checkBlackCompatibilityFunction, pythonCode);
 
     console.log(`🔍 Black compliance check: ${result.isCompliant ? 'compliant' : 'needs formatting'}`);
     return result;
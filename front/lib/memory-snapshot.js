@@ -0,0 +1,77 @@
+// Pyodide memory snapshots of a fully initialized interpreter, stored in IndexedDB
+// One snapshot is kept, under a key changing with the vendored assets (see pyodide-runtime.js).
+// Where snapshots don't work, a marker is kept under that key instead, so that they aren't attempted
+// again on every visit.
+// Snapshots only hold the WebAssembly memory, not the filesystem: the packages' files come back
+// from the persisted site-packages of package-cache.js.
+
+const DB_NAME = 'linter-explorer-snapshots';
+const STORE = 'snapshots';
+const UNSUPPORTED = 'unsupported';
+
+function openDatabase() {
+  return new Promise((resolve, reject) => {
+    const request = indexedDB.open(DB_NAME, 1);
+    request.onupgradeneeded = () => request.result.createObjectStore(STORE);
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+  });
+}
+
+async function withStore(mode, operation) {
+  const database = await openDatabase();
+  try {
+    return await new Promise((resolve, reject) => {
+      const transaction = database.transaction(STORE, mode);
+      const request = operation(transaction.objectStore(STORE));
+      transaction.oncomplete = () => resolve(request.result);
+      transaction.onerror = () => reject(transaction.error);
+    });
+  } finally {
+    database.close();
+  }
+}
+
+export function canSnapshot() {
+  return typeof indexedDB !== 'undefined';
+}
+
+// `{ snapshot, unsupported }` saved under `key`, `snapshot` being `null` when there is none (or it was
+// saved under another key) and `unsupported` whether snapshots were found not to work with this key
+export async function loadSnapshot(key) {
+  try {
+    const stored = await withStore('readonly', (store) => store.get(key));
+    return { snapshot: stored && stored !== UNSUPPORTED ? stored : null, unsupported: stored === UNSUPPORTED };
+  } catch (error) {
+    console.warn('⚠️ Failed to read the Pyodide memory snapshot:', error);
+    return { snapshot: null, unsupported: false };
+  }
+}
+
+// Replace the stored snapshot, so that stale ones don't pile up
+export async function saveSnapshot(key, snapshot) {
+  await withStore('readwrite', (store) => {
+    store.clear();
+    return store.put(snapshot, key);
+  });
+}
+
+// Record that snapshots don't work with `key`, replacing the stored snapshot
+export async function markSnapshotUnsupported(key) {
+  try {
+    await withStore('readwrite', (store) => {
+      store.clear();
+      return store.put(UNSUPPORTED, key);
+    });
+  } catch (error) {
+    console.warn('⚠️ Failed to record that Pyodide memory snapshots are unsupported:', error);
+  }
+}
+
+export async function deleteSnapshots() {
+  try {
+    await withStore('readwrite', (store) => store.clear());
+  } catch (error) {
+    console.warn('⚠️ Failed to delete the Pyodide memory snapshots:', error);
+  }
+}
@@ -0,0 +1,88 @@
+// Installed Python packages persisted across page loads, in an IndexedDB-backed site-packages
+// Used by offline builds only, whose python-assets.lock.json pins every wheel: the cache is keyed by the
+// lockfile hash and wiped when it changes, and a wheel is only reused when its dist-info is still there.
+
+const MARKER = '.python-assets-cache.json';
+
+function syncfs(FS, populate) {
+  return new Promise((resolve, reject) => {
+    FS.syncfs(populate, (error) => (error ? reject(error) : resolve()));
+  });
+}
+
+// `black-26.10.1-py3-none-any.whl` -> `black-26.10.1.dist-info`
+function distInfo(wheel) {
+  const [name, version] = wheel.split('/').pop().split('-');
+  return `${name}-${version}.dist-info`;
+}
+
+const WIPE_SCRIPT = `
+import os
+import shutil
+
+for entry in os.listdir(path):
+    full_path = os.path.join(path, entry)
+    if os.path.isdir(full_path) and not os.path.islink(full_path):
+        shutil.rmtree(full_path)
+    else:
+        os.remove(full_path)
+`;
+
+// Mount the persisted site-packages, returning the cache or `null` when it can't be used
+export async function openPackageCache(pyodide, lockHash) {
+  if (typeof indexedDB === 'undefined') return null;
+  const { FS } = pyodide;
+  const sitePackages = pyodide.runPython('import sysconfig; sysconfig.get_paths()["purelib"]');
+  // The mount would hide anything already installed
+  if (FS.readdir(sitePackages).some((entry) => entry !== '.' && entry !== '..')) {
+    console.warn('⚠️ site-packages is not empty, not persisting packages');
+    return null;
+  }
+
+  try {
+    FS.mount(FS.filesystems.IDBFS, {}, sitePackages);
+    await syncfs(FS, true);
+  } catch (error) {
+    console.warn('⚠️ IndexedDB package cache unavailable:', error);
+    return null;
+  }
+
+  const markerPath = `${sitePackages}/${MARKER}`;
+  let marker = null;
+  if (FS.analyzePath(markerPath).exists) {
+    try {
+      marker = JSON.parse(FS.readFile(markerPath, { encoding: 'utf8' }));
+    } catch {
+      marker = null;
+    }
+  }
+  if (!marker || marker.lockHash !== lockHash) {
+    if (marker) {
+      console.log('🧹 Python assets lockfile changed, clearing the package cache');
+    }
+    const namespace = pyodide.toPy({ path: sitePackages });
+    pyodide.runPython(WIPE_SCRIPT, { globals: namespace });
+    namespace.destroy();
+    marker = { lockHash, wheels: [] };
+  } else {
+    console.log(`💾 Package cache restored (${marker.wheels.length} wheel(s))`);
+  }
+  pyodide.runPython('import importlib; importlib.invalidate_caches()');
+
+  // Emscripten doesn't support concurrent syncfs calls, so saves are chained
+  let saving = Promise.resolve();
+  return {
+    // Whether `wheel` is installed from a previous page load (and wasn't uninstalled since)
+    has(wheel) {
+      return marker.wheels.includes(wheel) && FS.analyzePath(`${sitePackages}/${distInfo(wheel)}`).exists;
+    },
+
+    // Record `wheels` as installed and persist site-packages
+    async save(wheels) {
+      marker.wheels = [...new Set([...marker.wheels, ...wheels])];
+      FS.writeFile(markerPath, JSON.stringify(marker));
+      saving = saving.catch(() => {}).then(() => syncfs(FS, false));
+      await saving;
+    },
+  };
+}
@@ -0,0 +1,321 @@
+// Shared Pyodide runtime for every Python-backed tool (Black, Shed, ...)
+// The interpreter is booted once, and each tool acquires the packages it needs: a package is
+// installed on its first use, and reference-counted so that a tool only pays for its own packages
+// and releasing a tool only removes the packages no other tool uses.
+
+import { LOCAL_ASSETS_URL, PYODIDE_INDEX_URL, loadManifest } from './python-assets.js';
+import { openPackageCache } from './package-cache.js';
+import { canSnapshot, deleteSnapshots, loadSnapshot, markSnapshotUnsupported, saveSnapshot } from './memory-snapshot.js';
+
+// Bump when what goes into snapshots changes, so that older ones are ignored
+const SNAPSHOT_FORMAT = 1;
+
+// Kept on the global object, since the Shed UMD bundle embeds its own copy of this module:
+// both copies must share the same runtime
+const state = (globalThis.__linterExplorerPyodideRuntime ??= {
+  runtime: null, // Promise of the Pyodide instance
+  packageUsers: new Map(), // Package name -> Set of the tools using it
+  packageInstalls: new Map(), // Package name -> Promise of its installation
+  packageUninstalls: new Map(), // Package name -> Promise of its pending uninstallation
+  toolPackages: new Map(), // Tool name -> the package names it acquired
+  packageCache: null, // Persisted site-packages of offline builds, see package-cache.js
+});
+const { packageUsers, packageInstalls, packageUninstalls, toolPackages } = state;
+
+// Load Pyodide (from CDN, or the vendored assets of offline builds) dynamically
+async function loadPyodideScript() {
+  // Check if loadPyodide is already available globally
+  if (typeof window !== 'undefined' && window.loadPyodide) {
+    return window.loadPyodide;
+  }
+
+  // No document to add a <script> to in a Web Worker, use the ES module build instead
+  if (typeof document === 'undefined') {
+    const { loadPyodide } = await import(/* @vite-ignore */ `${PYODIDE_INDEX_URL}pyodide.mjs`);
+    return loadPyodide;
+  }
+
+  // Load Pyodide script
+  return new Promise((resolve, reject) => {
+    const script = document.createElement('script');
+    script.src = `${PYODIDE_INDEX_URL}pyodide.js`;
+    script.onload = () => {
+      if (window.loadPyodide) {
+        resolve(window.loadPyodide);
+      } else {
+        reject(new Error('loadPyodide not found after loading script'));
+      }
+    };
+    script.onerror = () => reject(new Error(`Failed to load Pyodide from ${PYODIDE_INDEX_URL}`));
+    document.head.appendChild(script);
+  });
+}
+
+// Checks that a restored interpreter works, including the packages' shared libraries and lazy imports
+const SNAPSHOT_CHECK = `
+import sys
+
+if "black" in sys.modules:
+    sys.modules["black"].format_str("x  =  1\\n", mode=sys.modules["black"].Mode())
+if "libcst" in sys.modules:
+    sys.modules["libcst"].parse_module("x = 1\\n")
+`;
+
+// An interpreter restored from `snapshot`, with every vendored requirement installed and imported
+async function restoreSnapshot(loadPyodide, snapshot, manifest) {
+  const pyodide = await loadPyodide({ indexURL: PYODIDE_INDEX_URL, _loadSnapshot: snapshot });
+  // The filesystem isn't part of the snapshot, the packages' files come from the package cache
+  state.packageCache = await openPackageCache(pyodide, manifest.lockHash);
+  if (!state.packageCache) {
+    throw new Error('a memory snapshot needs the package cache');
+  }
+  pyodide.runPython(SNAPSHOT_CHECK);
+  for (const name of Object.keys(manifest.requirements)) {
+    packageInstalls.set(name, Promise.resolve());
+  }
+  return pyodide;
+}
+
+// Install and import every vendored requirement in an interpreter started with `_makeSnapshot`,
+// then snapshot it (the interpreter can't be used afterwards)
+async function makeSnapshot(pyodide, manifest) {
+  const requirements = Object.keys(manifest.requirements);
+  await installPackages(pyodide, requirements);
+  const namespace = pyodide.toPy({ requirements });
+  pyodide.runPython('import importlib\nfor name in requirements:\n    importlib.import_module(name)', {
+    globals: namespace
+  });
+  namespace.destroy();
+  return pyodide.makeMemorySnapshot();
+}
+
+async function bootRuntime() {
+  console.log(`🔄 Loading shared Pyodide WASM environment from ${LOCAL_ASSETS_URL ? 'local assets' : 'CDN'}...`);
+  const loadPyodide = await loadPyodideScript();
+  if (!LOCAL_ASSETS_URL) {
+    const pyodide = await loadPyodide({ indexURL: PYODIDE_INDEX_URL });
+    console.log('🐍 Shared Pyodide runtime ready!');
+    return pyodide;
+  }
+
+  // Offline builds pin every package, so a snapshot of the initialized interpreter stays valid as
+  // long as Pyodide and the lockfile don't change
+  const manifest = await loadManifest();
+  const snapshotKey = `${manifest.pyodide}:${manifest.lockHash}:${SNAPSHOT_FORMAT}`;
+  const { snapshot, unsupported } = canSnapshot() ? await loadSnapshot(snapshotKey) : { unsupported: true };
+  if (snapshot) {
+    try {
+      const pyodide = await restoreSnapshot(loadPyodide, snapshot, manifest);
+      console.log('⚡ Shared Pyodide runtime restored from its memory snapshot!');
+      return pyodide;
+    } catch (error) {
+      console.warn('⚠️ Pyodide memory snapshot unusable, initializing normally:', error);
+      packageInstalls.clear();
+      await deleteSnapshots();
+    }
+  }
+
+  // Making a snapshot costs an extra interpreter boot, not worth repeating where it failed before
+  if (unsupported) {
+    return bootWithoutSnapshot(loadPyodide, manifest);
+  }
+  // An interpreter started with `_makeSnapshot` is only meant to be snapshotted, never to run tools:
+  // whatever happens, the runtime is a restored or a regular interpreter
+  const pyodide = await loadPyodide({ indexURL: PYODIDE_INDEX_URL, _makeSnapshot: true });
+  // Before anything gets installed, as the persisted site-packages is mounted over the empty one
+  state.packageCache = await openPackageCache(pyodide, manifest.lockHash);
+  let newSnapshot = null;
+  if (state.packageCache) {
+    try {
+      newSnapshot = await makeSnapshot(pyodide, manifest);
+    } catch (error) {
+      console.warn('⚠️ Failed to make a Pyodide memory snapshot:', error);
+    }
+  }
+  if (newSnapshot) {
+    // Restored right away: this checks the snapshot before saving it, and gives the usable interpreter
+    try {
+      const restored = await restoreSnapshot(loadPyodide, newSnapshot, manifest);
+      await saveSnapshot(snapshotKey, newSnapshot);
+      console.log('📸 Pyodide memory snapshot saved for the next visits');
+      return restored;
+    } catch (error) {
+      console.warn('⚠️ New Pyodide memory snapshot unusable, not saving it:', error);
+      packageInstalls.clear();
+    }
+  }
+  console.warn('⚠️ Not making Pyodide memory snapshots anymore for these Python assets');
+  await markSnapshotUnsupported(snapshotKey);
+  return bootWithoutSnapshot(loadPyodide, manifest);
+}
+
+// Regular initialization, without snapshots or once the snapshot path failed
+async function bootWithoutSnapshot(loadPyodide, manifest) {
+  const pyodide = await loadPyodide({ indexURL: PYODIDE_INDEX_URL });
+  state.packageCache = await openPackageCache(pyodide, manifest.lockHash);
+  console.log('🐍 Shared Pyodide runtime ready!');
+  return pyodide;
+}
+
+// micropip resolves and downloads from PyPI, offline builds load the vendored files of the manifest instead
+// (micropip is only loaded when needed, so that offline builds with a warm package cache never load it)
+async function installPackages(pyodide, names) {
+  if (!LOCAL_ASSETS_URL) {
+    await pyodide.loadPackage('micropip');
+    const micropip = pyodide.pyimport('micropip');
+    const requirements = pyodide.toPy(names);
+    try {
+      await micropip.install(requirements);
+    } finally {
+      requirements.destroy();
+      micropip.destroy();
+    }
+    return;
+  }
+  const { requirements } = await loadManifest();
+  const files = names.flatMap((name) => {
+    if (!requirements[name]) {
+      throw new Error(`${name} is not in the vendored Python assets, add it to python-assets.lock.json`);
+    }
+    return requirements[name];
+  });
+  // Wheels installed by a previous page load are reused, Pyodide packages are always loaded since
+  // loadPackage also loads their shared libraries (their files come from the browser's HTTP cache)
+  const cache = state.packageCache;
+  const wheels = files.filter((file) => file.endsWith('.whl'));
+  const cached = cache ? wheels.filter((wheel) => cache.has(wheel)) : [];
+  if (cached.length) {
+    console.log(`💾 Reusing ${cached.length} cached wheel(s)`);
+  }
+  // Pyodide packages by name, wheels by URL, both from the local index
+  const toLoad = files.filter((file) => !cached.includes(file));
+  await pyodide.loadPackage(toLoad.map((file) => (file.endsWith('.whl') ? `${PYODIDE_INDEX_URL}${file}` : file)));
+  if (cache) {
+    await cache.save(wheels);
+  }
+}
+
+export function getPyodide() {
+  if (!state.runtime) {
+    const runtime = (state.runtime = bootRuntime());
+    // A failed boot can be retried by the next caller
+    runtime.catch(() => {
+      if (state.runtime === runtime) state.runtime = null;
+    });
+  }
+  return state.runtime;
+}
+
+// Install `packages` for `tool` (installing only the ones no other tool installed yet), returning the runtime
+export async function acquirePackages(tool, packages) {
+  const pyodide = await getPyodide();
+  // A package being uninstalled is installed again once the uninstall is done, not concurrently
+  let uninstalls;
+  while ((uninstalls = packages.filter((name) => packageUninstalls.has(name))).length) {
+    await Promise.allSettled(uninstalls.map((name) => packageUninstalls.get(name)));
+  }
+  const acquired = toolPackages.get(tool) || new Set();
+  toolPackages.set(tool, acquired);
+
+  const missing = packages.filter((name) => !packageInstalls.has(name));
+  if (missing.length) {
+    console.log(`📦 Installing ${missing.join(', ')} for ${tool}...`);
+    const install = installPackages(pyodide, missing);
+    for (const name of missing) {
+      packageInstalls.set(name, install);
+    }
+    install.catch(() => {
+      for (const name of missing) {
+        packageInstalls.delete(name);
+      }
+    });
+  }
+  await Promise.all(packages.map((name) => packageInstalls.get(name)));
+
+  for (const name of packages) {
+    acquired.add(name);
+    if (!packageUsers.has(name)) packageUsers.set(name, new Set());
+    packageUsers.get(name).add(tool);
+  }
+  return pyodide;
+}
+
+// Drop `tool`'s packages, uninstalling (and unimporting) the ones no other tool uses
+// When no tool is left, the runtime itself is dropped, and the next tool boots a fresh one
+export async function releasePackages(tool) {
+  const acquired = toolPackages.get(tool);
+  if (!acquired || !state.runtime) return;
+  toolPackages.delete(tool);
+
+  const unused = [];
+  for (const name of acquired) {
+    const users = packageUsers.get(name);
+    users.delete(tool);
+    if (!users.size) {
+      packageUsers.delete(name);
+      packageInstalls.delete(name);
+      unused.push(name);
+    }
+  }
+
+  if (!toolPackages.size) {
+    console.log('🧹 No tool left, dropping the shared Pyodide runtime');
+    state.runtime = null;
+    state.packageCache = null;
+    packageInstalls.clear();
+    return;
+  }
+  if (unused.length) {
+    console.log(`🧹 Uninstalling ${unused.join(', ')}, not used anymore`);
+    const uninstall = uninstallPackages(state.runtime, unused);
+    for (const name of unused) {
+      packageUninstalls.set(name, uninstall);
+    }
+    try {
+      await uninstall;
+    } finally {
+      for (const name of unused) {
+        if (packageUninstalls.get(name) === uninstall) packageUninstalls.delete(name);
+      }
+    }
+  }
+}
+
+async function uninstallPackages(runtime, names) {
+  const pyodide = await runtime;
+  await pyodide.loadPackage('micropip');
+  const namespace = pyodide.toPy({});
+  const uninstall = pyodide.runPython(UNINSTALL_FUNCTION, { globals: namespace });
+  try {
+    uninstall(names);
+    // Or loadPackage would consider them still loaded
+    for (const name of names) {
+      delete pyodide.loadedPackages[name];
+    }
+  } finally {
+    uninstall.destroy();
+    namespace.destroy();
+  }
+}
+
+const UNINSTALL_FUNCTION = `
+import sys
+import importlib.metadata
+import micropip
+
+def uninstall(names):
+    for name in names:
+        # Top-level modules of the distribution, e.g. black, blib2to3 and _black_version for black
+        files = importlib.metadata.distribution(name).files or ()
+        top_levels = {
+            str(path).split("/")[0].split(".")[0]
+            for path in files
+            if not str(path).split("/")[0].endswith((".dist-info", ".data"))
+        }
+        micropip.uninstall(name)
+        for module in list(sys.modules):
+            if module.split(".")[0] in top_levels:
+                del sys.modules[module]
+
+uninstall
+`;
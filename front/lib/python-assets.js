@@ -0,0 +1,34 @@
+// Where the Pyodide runtime, the Python packages and Ruff WASM come from
+// By default jsdelivr and PyPI (through micropip). Offline builds (`npm run build:*:offline`, see
+// ../vite-python-assets.js) define __PYTHON_ASSETS__, the path of the vendored assets relative to the
+// built chunk, and then only local URLs are used.
+
+const PYTHON_ASSETS_PATH = typeof __PYTHON_ASSETS__ !== 'undefined' ? __PYTHON_ASSETS__ : null;
+
+export const LOCAL_ASSETS_URL = PYTHON_ASSETS_PATH ? new URL(PYTHON_ASSETS_PATH, import.meta.url).href : null;
+
+export const PYODIDE_INDEX_URL = LOCAL_ASSETS_URL
+  ? `${LOCAL_ASSETS_URL}pyodide/`
+  : 'https://cdn.jsdelivr.net/pyodide/v0.28.2/full/';
+
+export const RUFF_WASM_URL = LOCAL_ASSETS_URL
+  ? `${LOCAL_ASSETS_URL}ruff/ruff_wasm.js`
+  : 'https://cdn.jsdelivr.net/npm/@astral-sh/ruff-wasm-web@0.14.0/ruff_wasm.js';
+
+let manifest = null;
+
+// The vendored assets' manifest: `{ lockHash, pyodide, requirements: { name: [Pyodide package or wheel path] } }`
+export function loadManifest() {
+  if (!manifest) {
+    manifest = fetch(`${LOCAL_ASSETS_URL}manifest.json`).then((response) => {
+      if (!response.ok) {
+        throw new Error(`Failed to load the Python assets manifest: ${response.status}`);
+      }
+      return response.json();
+    });
+    manifest.catch(() => {
+      manifest = null;
+    });
+  }
+  return manifest;
+}
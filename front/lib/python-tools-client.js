@@ -0,0 +1,115 @@
+// Promise-based client of python-tools-worker.js, keeping the page responsive while Black or Shed run
+// Requests are queued by priority (FIFO within a priority) and sent to the worker one at a time.
+// A request with a `key` supersedes the pending ones with the same key, e.g. one key per editor so that
+// only the latest keystroke's request gets processed.
+// Once the worker failed or was terminated, the client is closed: every request is rejected.
+
+export class CancelledError extends Error {
+  constructor(message = 'Request cancelled') {
+    super(message);
+    this.name = 'CancelledError';
+  }
+}
+
+export class PythonToolsClient {
+  constructor(worker = new Worker(new URL('./python-tools-worker.js', import.meta.url), { type: 'module' })) {
+    this.worker = worker;
+    this.queue = []; // Pending requests, highest priority first
+    this.running = null;
+    this.nextId = 1;
+    this.closedError = null; // Why the client is closed, `null` while it is open
+    this.worker.onmessage = (event) => this.handleMessage(event.data);
+    // The worker catches the tools' errors, so this is the worker itself failing, e.g. to load
+    this.worker.onerror = (event) => {
+      console.error('❌ Python tools worker failed:', event.message);
+      this.close(new Error(`Python tools worker failed: ${event.message || 'Worker error'}`));
+    };
+  }
+
+  // Run `tool(...args)` in the worker, higher `priority` requests going first
+  request(tool, args = [], { priority = 0, key = null } = {}) {
+    if (this.closedError) {
+      return Promise.reject(this.closedError);
+    }
+    if (key !== null) {
+      this.cancel(key);
+    }
+    return new Promise((resolve, reject) => {
+      const request = { id: this.nextId++, tool, args, priority, key, resolve, reject, cancelled: false };
+      const index = this.queue.findIndex((queued) => queued.priority < priority);
+      this.queue.splice(index === -1 ? this.queue.length : index, 0, request);
+      this.dispatch();
+    });
+  }
+
+  // Reject the pending requests with `key` (all of them without a key), returning how many were cancelled
+  // A running request can't be interrupted inside Pyodide: its result is dropped when it arrives
+  cancel(key = null) {
+    const cancelled = this.queue.filter((request) => key === null || request.key === key);
+    this.queue = this.queue.filter((request) => !cancelled.includes(request));
+    if (this.running && !this.running.cancelled && (key === null || this.running.key === key)) {
+      this.running.cancelled = true;
+      cancelled.push(this.running);
+    }
+    for (const request of cancelled) {
+      request.reject(new CancelledError(`${request.tool} request superseded or cancelled`));
+    }
+    return cancelled.length;
+  }
+
+  dispatch() {
+    if (this.running || !this.queue.length) return;
+    this.running = this.queue.shift();
+    const { id, tool, args } = this.running;
+    this.worker.postMessage({ id, tool, args });
+  }
+
+  handleMessage({ id, result, error }) {
+    const request = this.running;
+    if (!request || request.id !== id) return;
+    this.running = null;
+    if (!request.cancelled) {
+      if (error !== undefined) {
+        request.reject(new Error(error));
+      } else {
+        request.resolve(result);
+      }
+    }
+    this.dispatch();
+  }
+
+  formatWithBlack(pythonCode, options = {}, requestOptions = {}) {
+    return this.request('formatWithBlack', [pythonCode, options], requestOptions);
+  }
+
+  checkBlackCompatibility(pythonCode, requestOptions = {}) {
+    return this.request('checkBlackCompatibility', [pythonCode], requestOptions);
+  }
+
+  formatWithShed(pythonCode, requestOptions = {}) {
+    return this.request('formatWithShed', [pythonCode], requestOptions);
+  }
+
+  analyzeShedImprovements(pythonCode, requestOptions = {}) {
+    return this.request('analyzeShedImprovements', [pythonCode], requestOptions);
+  }
+
+  // Close the client, rejecting the running and pending requests (and later ones) with `error`
+  close(error) {
+    if (this.closedError) return;
+    this.closedError = error;
+    const pending = [this.running, ...this.queue].filter((request) => request && !request.cancelled);
+    this.running = null;
+    this.queue = [];
+    for (const request of pending) {
+      request.reject(error);
+    }
+  }
+
+  // Stop the worker, cancelling every pending request
+  terminate() {
+    this.cancel();
+    this.close(new Error('Python tools worker terminated'));
+    this.worker.terminate();
+  }
+}
@@ -0,0 +1,24 @@
+// Web Worker running the Pyodide-backed tools (Black, Shed) off the main thread
+// Driven by python-tools-client.js, one request at a time: `{ id, tool, args }` -> `{ id, result }` or `{ id, error }`
+
+import { formatWithBlack, checkBlackCompatibility } from './black-formatter.js';
+import { formatWithShed, analyzeShedImprovements } from './shed-formatter-bundle.js';
+
+const TOOLS = {
+  formatWithBlack,
+  checkBlackCompatibility,
+  formatWithShed,
+  analyzeShedImprovements
+};
+
+self.onmessage = async (event) => {
+  const { id, tool, args } = event.data;
+  try {
+    if (!TOOLS[tool]) {
+      throw new Error(`Unknown tool: ${tool}`);
+    }
+    self.postMessage({ id, result: await TOOLS[tool](...args) });
+  } catch (error) {
+    self.postMessage({ id, error: error.message });
+  }
+};
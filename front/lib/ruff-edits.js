@@ -0,0 +1,77 @@
+// Applying Ruff fix edits to a string, for the `ruff check --fix-only` emulation of the Shed bridge
+// Edit positions are Ruff's: 1-based rows, and 1-based columns counted in UTF-8 bytes (the workspace
+// uses PositionEncoding.Utf8), while JavaScript strings are indexed in UTF-16 code units.
+
+// Offsets of the start of every line, lines ending like Ruff's with \n, \r\n or \r
+export function lineStarts(code) {
+  const starts = [0];
+  for (let index = 0; index < code.length; index++) {
+    const char = code.charCodeAt(index);
+    if (char === 10 /* \n */ || (char === 13 /* \r */ && code.charCodeAt(index + 1) !== 10)) {
+      starts.push(index + 1);
+    }
+  }
+  return starts;
+}
+
+// Converter of Ruff positions to string offsets, for positions given in increasing order
+// A cursor is kept between calls, so that converting all the positions of a string visits each
+// character at most once. A position before the previous one is walked again from its line's start.
+export function offsetConverter(code) {
+  const starts = lineStarts(code);
+  let row = 1;
+  let bytes = 0; // UTF-8 bytes from the start of `row` to `offset`
+  let offset = 0;
+  return (targetRow, targetColumn) => {
+    if (targetRow > starts.length) return code.length;
+    const targetBytes = targetColumn - 1;
+    if (targetRow !== row || targetBytes < bytes) {
+      row = targetRow;
+      bytes = 0;
+      offset = starts[row - 1];
+    }
+    while (bytes < targetBytes && offset < code.length) {
+      const char = code.charCodeAt(offset);
+      if (char < 0x80) {
+        bytes += 1;
+        offset += 1;
+      } else if (char < 0x800) {
+        bytes += 2;
+        offset += 1;
+      } else if (char >= 0xd800 && char <= 0xdbff) {
+        // A surrogate pair: 4 UTF-8 bytes for 2 UTF-16 code units
+        bytes += 4;
+        offset += 2;
+      } else {
+        bytes += 3;
+        offset += 1;
+      }
+    }
+    return offset;
+  };
+}
+
+const comparePositions = (aRow, aColumn, bRow, bColumn) => aRow - bRow || aColumn - bColumn;
+
+// Apply non-overlapping `{ startRow, startCol, endRow, endCol, content }` edits in one linear pass
+export function applyEdits(code, edits) {
+  // Sorted by position first, so that positions are converted in order (sort is stable, which keeps
+  // the given order of insertions at the same position)
+  const sorted = [...edits].sort(
+    (a, b) =>
+      comparePositions(a.startRow, a.startCol, b.startRow, b.startCol) ||
+      comparePositions(a.endRow, a.endCol, b.endRow, b.endCol)
+  );
+  const toOffset = offsetConverter(code);
+
+  const parts = [];
+  let position = 0;
+  for (const edit of sorted) {
+    const start = toOffset(edit.startRow, edit.startCol);
+    const end = toOffset(edit.endRow, edit.endCol);
+    parts.push(code.slice(position, start), edit.content);
+    position = end;
+  }
+  parts.push(code.slice(position));
+  return parts.join('');
+}
@@ -0,0 +1,199 @@
+import { describe, it, expect, beforeAll, afterAll } from 'vitest';
+import { setupBrowser, teardownBrowser, page } from '../helpers/browser.js';
+import express from 'express';
+import { fileURLToPath } from 'url';
+import { dirname, join, relative, resolve, sep } from 'path';
+import { existsSync, readdirSync, readFileSync, writeFileSync } from 'fs';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+// Streams a whole corpus through the WASM tools of one page, loaded once, and compares the
+// results with the native references of `compare_configurations.py --corpus`, e.g.:
+//   make generate-corpus-references && make verify-browser-parity
+// PARITY_CORPUS and PARITY_OUTPUTS default to the Makefile's CORPUS and the reference tree,
+// PARITY_CONFIGURATIONS selects configurations (comma-separated), PARITY_REPORT writes
+// every mismatch as JSON.
+const repositoryRoot = join(__dirname, '../../..');
+const corpus = resolve(repositoryRoot, process.env.PARITY_CORPUS || 'test_files/shed_inputs');
+const corpusOutputs = resolve(repositoryRoot, process.env.PARITY_OUTPUTS || 'test_files/corpus_outputs');
+// Inputs sent to the page per `page.evaluate`, so that one round trip doesn't carry the whole corpus
+const batchSize = Number(process.env.PARITY_BATCH_SIZE || 20);
+
+// Native configuration name -> the function of `window.parityTools` giving the same output
+const BROWSER_CONFIGURATIONS = {
+  ruff_format_only: 'ruffFormat',
+  black_only: 'black',
+  shed_format_no_refactor: 'shed',
+};
+
+const selectedConfigurations = (
+  process.env.PARITY_CONFIGURATIONS ? process.env.PARITY_CONFIGURATIONS.split(',') : Object.keys(BROWSER_CONFIGURATIONS)
+).filter((name) => existsSync(join(corpusOutputs, name)));
+
+// Same files as `find_corpus_files` for a directory: sorted, hidden files (the manifest) skipped
+function findCorpusFiles(directory) {
+  if (!existsSync(directory)) return [];
+  return readdirSync(directory, { recursive: true, withFileTypes: true })
+    .filter((entry) => entry.isFile())
+    .map((entry) => relative(directory, join(entry.parentPath ?? entry.path, entry.name)))
+    .filter((path) => !path.split(sep).some((part) => part.startsWith('.')))
+    .sort();
+}
+
+function readReference(name, path) {
+  const referenceFile = join(corpusOutputs, name, path);
+  return existsSync(referenceFile) ? readFileSync(referenceFile, 'utf-8') : null;
+}
+
+// `line N: native ... / browser ...` for the first differing line, to spot the issue without a diff tool
+function describeDifference(native, browser) {
+  if (native === null) return 'no native reference (the native tool failed)';
+  if (browser === null) return 'the browser tool failed';
+  const nativeLines = native.split('\n');
+  const browserLines = browser.split('\n');
+  let line = 0;
+  while (nativeLines[line] === browserLines[line]) line++;
+  return `line ${line + 1}: native ${JSON.stringify(nativeLines[line] ?? '<end>')} / browser ${JSON.stringify(browserLines[line] ?? '<end>')}`;
+}
+
+const corpusFiles = findCorpusFiles(corpus);
+
+describe.skipIf(!corpusFiles.length || !selectedConfigurations.length)('Browser vs native corpus parity', () => {
+  let server;
+  let serverUrl;
+
+  beforeAll(async () => {
+    await setupBrowser();
+    // Hundreds of formatting runs would flood the output, only keep the page's errors
+    page.removeAllListeners('console');
+    page.on('console', (msg) => {
+      if (msg.type() === 'error') console.error('🌐', msg.text());
+    });
+
+    const app = express();
+    const projectRoot = join(__dirname, '../..');
+    app.use(express.static(projectRoot));
+    app.use('/node_modules', express.static(join(projectRoot, 'node_modules')));
+
+    const port = 3004;
+    server = app.listen(port);
+    serverUrl = `http://localhost:${port}`;
+
+    await page.goto(`${serverUrl}/demo-python-linting.html`);
+
+    // Every tool is loaded once for the whole corpus
+    await page.addScriptTag({
+      type: 'module',
+      content: `
+        import init, { Workspace, PositionEncoding } from '/node_modules/@astral-sh/ruff-wasm-web/ruff_wasm.js';
+        import { initializeBlack, formatWithBlack } from './lib/black-formatter.js';
+        await init();
+        const ruffWorkspace = new Workspace({ 'line-length': 88 }, PositionEncoding.Utf8);
+        window.parityTools = {
+          initializeBlack,
+          // Like the native ruff_format backend, which gives Ruff's empty stdout for an input it can't parse
+          ruffFormat: async (code) => {
+            try {
+              return ruffWorkspace.format(code);
+            } catch {
+              return '';
+            }
+          },
+          // Same target versions as the native black_format backend, which some constructs depend on
+          black: async (code) => {
+            const result = await formatWithBlack(code, { targetVersions: ['PY39'] });
+            if (!result.success) throw new Error(result.error);
+            return result.formatted;
+          },
+          shed: async (code) => {
+            const result = await window.ShedFormatter.formatWithShed(code);
+            if (!result.success) throw new Error(result.error);
+            return result.formatted;
+          },
+        };
+      `,
+    });
+    if (selectedConfigurations.includes('shed_format_no_refactor')) {
+      await page.addScriptTag({ path: join(projectRoot, 'dist/shed-formatter.umd.cjs') });
+      await page.waitForFunction(() => window.ShedFormatter !== undefined, { timeout: 10000 });
+    }
+    await page.waitForFunction(() => window.parityTools !== undefined, { timeout: 30000 });
+    if (selectedConfigurations.includes('black_only')) {
+      await page.evaluate(() => window.parityTools.initializeBlack());
+    }
+  }, 300000);
+
+  afterAll(async () => {
+    await teardownBrowser();
+    if (server) {
+      server.close();
+    }
+  });
+
+  it('should match the native corpus references for every input', async () => {
+    const tools = selectedConfigurations.map((name) => BROWSER_CONFIGURATIONS[name]);
+    console.log(`📁 Corpus: ${corpus} (${corpusFiles.length} files), checking ${selectedConfigurations.join(', ')}`);
+
+    const mismatches = [];
+    const start = performance.now();
+    for (let position = 0; position < corpusFiles.length; position += batchSize) {
+      const paths = corpusFiles.slice(position, position + batchSize);
+      const codes = paths.map((path) => readFileSync(join(corpus, path), 'utf-8'));
+
+      // A failing tool gives `null`, as a failing native tool has no reference file
+      const outputs = await page.evaluate(
+        async (codes, tools) => {
+          const outputs = [];
+          for (const code of codes) {
+            const row = {};
+            for (const tool of tools) {
+              try {
+                row[tool] = await window.parityTools[tool](code);
+              } catch (error) {
+                console.error(`❌ ${tool} failed:`, error.message);
+                row[tool] = null;
+              }
+            }
+            outputs.push(row);
+          }
+          return outputs;
+        },
+        codes,
+        tools,
+      );
+
+      paths.forEach((path, index) => {
+        const differs = [];
+        for (const name of selectedConfigurations) {
+          const native = readReference(name, path);
+          const browser = outputs[index][BROWSER_CONFIGURATIONS[name]];
+          if (browser !== native) {
+            differs.push(name);
+            mismatches.push({ path, configuration: name, difference: describeDifference(native, browser) });
+          }
+        }
+        const done = position + index + 1;
+        const details = differs.length ? ` (differs: ${differs.join(', ')})` : '';
+        console.log(`  ${differs.length ? '❌' : '✅'} [${done}/${corpusFiles.length}] ${path}${details}`);
+      });
+    }
+
+    const seconds = (performance.now() - start) / 1000;
+    console.log(`⏱️ ${corpusFiles.length} files in ${seconds.toFixed(1)}s`);
+    if (process.env.PARITY_REPORT) {
+      writeFileSync(process.env.PARITY_REPORT, JSON.stringify(mismatches, null, 2) + '\n');
+      console.log(`📝 Mismatches written to ${process.env.PARITY_REPORT}`);
+    }
+    if (mismatches.length) {
+      console.log(`❌ ${mismatches.length} browser output(s) differ from the native references:`);
+      for (const { path, configuration, difference } of mismatches) {
+        console.log(`  ❌ ${path}: ${configuration}, ${difference}`);
+      }
+    } else {
+      console.log('✅ Browser outputs match the native references!');
+    }
+
+    expect(mismatches).toEqual([]);
+  }, 3600000);
+});
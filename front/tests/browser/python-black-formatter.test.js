@@ -239,6 +239,39 @@ result
     console.log('✅ Black compliance checking works in headless browser!');
   }, 120000);
 
+  it('should format code with backslashes and triple quotes through the lib', async () => {
+    // These used to break the generated script the code was pasted into
+    const pythonCode = 'x  =  """a \\""" b"""\ny = \'\\n\'  # \\\n';
+
+    await page.goto(`${serverUrl}/demo-python-linting.html`);
+
+    await page.addScriptTag({
+      type: 'module',
+      content: `
+        import { formatWithBlack } from './lib/black-formatter.js';
+        window.formatWithBlack = formatWithBlack;
+        window.blackFormatterLoaded = true;
+      `
+    });
+
+    await page.waitForFunction(() => window.blackFormatterLoaded === true, { timeout: 10000 });
+
+    const result = await page.evaluate(async (testCode) => {
+      try {
+        return await window.formatWithBlack(testCode);
+      } catch (error) {
+        return {
+          success: false,
+          error: error.message
+        };
+      }
+    }, pythonCode, { timeout: 60000 });
+
+    expect(result.success).toBe(true);
+    expect(result.original).toBe(pythonCode);
+    expect(result.formatted).toBe('x = """a \\""" b"""\ny = "\\n"  # \\\n');
+  }, 120000);
+
   it('should match local Black formatter output exactly', async () => {
     // Load the comprehensive test file and local reference
     const testFilesDir = join(__dirname, '../../../test_files');
@@ -272,4 +272,55 @@ def test_function():
     console.log(`📊 Refactor mode would save ${localShedNoRefactor.length - localShedWithRefactor.length} additional chars`);
   }, 180000);
 
+  it('should share one Pyodide runtime and one Black install with the Black formatter', async () => {
+    await page.goto(`${serverUrl}/front/demo-python-linting.html`);
+
+    await page.addScriptTag({
+      path: join(__dirname, '../../dist/shed-formatter.umd.cjs')
+    });
+    await page.addScriptTag({
+      type: 'module',
+      content: `
+        import { formatWithBlack, releaseBlack } from './lib/black-formatter.js';
+        window.formatWithBlack = formatWithBlack;
+        window.releaseBlack = releaseBlack;
+        window.blackFormatterLoaded = true;
+      `
+    });
+
+    await page.waitForFunction(() => window.ShedFormatter !== undefined && window.blackFormatterLoaded === true, {
+      timeout: 10000
+    });
+
+    const result = await page.evaluate(async () => {
+      const shedResult = await window.ShedFormatter.formatWithShed('x  =  1\n');
+      const blackResult = await window.formatWithBlack('y  =  2\n');
+      const state = window.__linterExplorerPyodideRuntime;
+      const shedAgain = await window.ShedFormatter.formatWithShed('z  =  3\n');
+      const users = (name) => [...(state.packageUsers.get(name) || [])].sort();
+      const shared = { black: users('black'), libcst: users('libcst') };
+
+      // Releasing Black keeps the packages Shed still uses
+      await window.releaseBlack();
+      const afterRelease = { black: users('black'), runtimeKept: state.runtime !== null };
+      const shedAfterRelease = await window.ShedFormatter.formatWithShed('w  =  4\n');
+
+      return {
+        shed: shedResult.formatted,
+        black: blackResult.formatted,
+        shedAgain: shedAgain.formatted,
+        shared,
+        afterRelease,
+        shedAfterRelease: shedAfterRelease.formatted
+      };
+    });
+
+    expect(result.shed).toBe('x = 1\n');
+    expect(result.black).toBe('y = 2\n');
+    expect(result.shedAgain).toBe('z = 3\n');
+    expect(result.shared).toEqual({ black: ['black', 'shed'], libcst: ['shed'] });
+    expect(result.afterRelease).toEqual({ black: ['shed'], runtimeKept: true });
+    expect(result.shedAfterRelease).toBe('w = 4\n');
+  }, 180000);
+
 });
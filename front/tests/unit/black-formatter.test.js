@@ -0,0 +1,60 @@
+import { describe, it, expect, beforeAll } from 'vitest';
+import { formatWithBlack, initializeBlack, releaseBlack } from '../../lib/black-formatter.js';
+
+// Stands in for Pyodide with Black installed, logging installs and the definitions of the helpers
+class FakePyodide {
+  constructor() {
+    this.log = [];
+    this.loadedPackages = {};
+  }
+
+  async loadPackage() {}
+
+  pyimport() {
+    return { install: async (names) => this.log.push(`install ${names.join(', ')}`), destroy() {} };
+  }
+
+  // Lists stay arrays, dicts become Map-like namespaces
+  toPy(value) {
+    const converted = Array.isArray(value) ? value : new Map(Object.entries(value));
+    return Object.assign(converted, { destroy() {} });
+  }
+
+  // The helpers of black-formatter.js, formatting by normalizing the spaces around `=`, or the uninstall
+  // function of pyodide-runtime.js
+  runPython(code, { globals }) {
+    if (!code.includes('def format_with_black')) {
+      return Object.assign((names) => this.log.push(`uninstall ${names.join(', ')}`), { destroy() {} });
+    }
+    this.log.push('define helpers');
+    const helper = (entries) =>
+      Object.assign(
+        (...args) => ({ toJs: ({ dict_converter }) => dict_converter(entries(...args)), destroy() {} }),
+        { destroy() {} }
+      );
+    globals.set('format_with_black', helper((code) => [['success', true], ['formatted', code.replace(/\s*=\s*/g, ' = ')]]));
+    globals.set('check_black_compatibility', helper(() => [['success', true]]));
+  }
+}
+
+describe('Black formatter initialization', () => {
+  let pyodide;
+
+  beforeAll(() => {
+    pyodide = new FakePyodide();
+    window.loadPyodide = async () => pyodide;
+  });
+
+  it('should initialize once for concurrent first calls', async () => {
+    const results = await Promise.all([formatWithBlack('x=1\n'), formatWithBlack('y=2\n'), initializeBlack()]);
+
+    expect(results.slice(0, 2).map(({ formatted }) => formatted)).toEqual(['x = 1\n', 'y = 2\n']);
+    expect(pyodide.log).toEqual(['install black', 'define helpers']);
+  });
+
+  it('should initialize again after a release', async () => {
+    await releaseBlack();
+    expect((await formatWithBlack('z=3\n')).formatted).toBe('z = 3\n');
+    expect(pyodide.log).toEqual(['install black', 'define helpers', 'install black', 'define helpers']);
+  });
+});
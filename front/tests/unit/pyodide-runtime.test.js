@@ -0,0 +1,62 @@
+import { describe, it, expect, beforeAll } from 'vitest';
+import { acquirePackages, releasePackages } from '../../lib/pyodide-runtime.js';
+
+// Stands in for Pyodide, logging micropip installs and uninstalls
+// `holdUninstall` makes the next uninstall wait until the function it returns is called
+class FakePyodide {
+  constructor() {
+    this.log = [];
+    this.loadedPackages = {};
+    this.held = null;
+  }
+
+  holdUninstall() {
+    let resume;
+    this.held = new Promise((resolve) => (resume = resolve));
+    return resume;
+  }
+
+  // The uninstall starts with loading micropip
+  async loadPackage() {
+    const held = this.held;
+    this.held = null;
+    await held;
+  }
+
+  pyimport() {
+    return { install: async (names) => this.log.push(`install ${names.join(', ')}`), destroy() {} };
+  }
+
+  toPy(value) {
+    return Object.assign(value, { destroy() {} });
+  }
+
+  // Only gives the uninstall function of pyodide-runtime.js, its only Python code on the CDN path
+  runPython() {
+    return Object.assign((names) => this.log.push(`uninstall ${names.join(', ')}`), { destroy() {} });
+  }
+}
+
+describe('Shared Pyodide runtime packages', () => {
+  let pyodide;
+
+  beforeAll(() => {
+    pyodide = new FakePyodide();
+    window.loadPyodide = async () => pyodide;
+  });
+
+  it('should wait for a pending uninstall before installing the same package again', async () => {
+    await acquirePackages('black', ['black']);
+    await acquirePackages('shed', ['libcst']);
+
+    const resume = pyodide.holdUninstall();
+    const release = releasePackages('black');
+    const reacquire = acquirePackages('other', ['black']);
+    await new Promise((resolve) => setTimeout(resolve, 10));
+    expect(pyodide.log).toEqual(['install black', 'install libcst']);
+
+    resume();
+    await Promise.all([release, reacquire]);
+    expect(pyodide.log).toEqual(['install black', 'install libcst', 'uninstall black', 'install black']);
+  });
+});
@@ -0,0 +1,96 @@
+import { describe, it, expect, beforeEach } from 'vitest';
+import { PythonToolsClient, CancelledError } from '../../lib/python-tools-client.js';
+
+// Stands in for python-tools-worker.js: records the messages, and answers when told to
+class FakeWorker {
+  constructor() {
+    this.messages = [];
+    this.terminated = false;
+  }
+
+  postMessage(message) {
+    this.messages.push(message);
+  }
+
+  reply(result) {
+    const { id } = this.messages[this.messages.length - 1];
+    this.onmessage({ data: { id, result } });
+  }
+
+  terminate() {
+    this.terminated = true;
+  }
+}
+
+describe('PythonToolsClient request queue', () => {
+  let worker;
+  let client;
+
+  beforeEach(() => {
+    worker = new FakeWorker();
+    client = new PythonToolsClient(worker);
+  });
+
+  it('should send one request at a time, by priority then in order', async () => {
+    const first = client.formatWithShed('a');
+    const low = client.formatWithShed('b');
+    const high = client.formatWithBlack('c', {}, { priority: 1 });
+    const low2 = client.formatWithShed('d');
+
+    expect(worker.messages.map(({ args }) => args[0])).toEqual(['a']);
+    for (const expected of ['c', 'b', 'd']) {
+      worker.reply(`${worker.messages[worker.messages.length - 1].args[0]}!`);
+      expect(worker.messages[worker.messages.length - 1].args[0]).toBe(expected);
+    }
+    worker.reply('d!');
+
+    expect(await Promise.all([first, low, high, low2])).toEqual(['a!', 'b!', 'c!', 'd!']);
+  });
+
+  it('should only process the latest request of a key', async () => {
+    const running = client.formatWithShed('x = 1', { key: 'editor' });
+    const superseded = client.formatWithShed('x = 12', { key: 'editor' });
+    const latest = client.formatWithShed('x = 123', { key: 'editor' });
+    const other = client.formatWithBlack('y = 1', {}, { key: 'other' });
+
+    await expect(running).rejects.toBeInstanceOf(CancelledError);
+    await expect(superseded).rejects.toBeInstanceOf(CancelledError);
+
+    // The running request's result is dropped, then the latest one goes to the worker
+    worker.reply('x = 1\n');
+    expect(worker.messages.map(({ args }) => args[0])).toEqual(['x = 1', 'x = 123']);
+    worker.reply('x = 123\n');
+    worker.reply('y = 1\n');
+    expect(await latest).toBe('x = 123\n');
+    expect(await other).toBe('y = 1\n');
+  });
+
+  it('should reject pending requests when terminated', async () => {
+    const pending = [client.formatWithShed('a'), client.formatWithShed('b')];
+    client.terminate();
+
+    for (const request of pending) {
+      await expect(request).rejects.toBeInstanceOf(CancelledError);
+    }
+    expect(worker.terminated).toBe(true);
+    await expect(client.formatWithShed('c')).rejects.toThrow('terminated');
+  });
+
+  it('should reject running, pending and later requests once the worker failed', async () => {
+    const pending = [client.formatWithShed('a'), client.formatWithShed('b')];
+    worker.onerror({ message: 'Failed to load' });
+
+    for (const request of pending) {
+      await expect(request).rejects.toThrow('Python tools worker failed: Failed to load');
+    }
+    await expect(client.formatWithShed('c')).rejects.toThrow('Python tools worker failed: Failed to load');
+    expect(worker.messages).toHaveLength(1);
+  });
+
+  it('should reject later requests when the worker failed with nothing running', async () => {
+    worker.onerror({ message: 'Failed to load' });
+
+    await expect(client.formatWithShed('a')).rejects.toThrow('Failed to load');
+    expect(worker.messages).toHaveLength(0);
+  });
+});
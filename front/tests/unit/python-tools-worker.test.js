@@ -0,0 +1,82 @@
+import { describe, it, expect, beforeAll } from 'vitest';
+import { PythonToolsClient } from '../../lib/python-tools-client.js';
+
+// Stands in for Pyodide with Black installed, its "formatting" only normalizing the spaces around `=`
+class FakePyodide {
+  constructor() {
+    this.loadedPackages = {};
+  }
+
+  async loadPackage() {}
+
+  pyimport() {
+    return { install: async () => {}, destroy() {} };
+  }
+
+  toPy() {
+    const namespace = new Map();
+    namespace.destroy = () => {};
+    return namespace;
+  }
+
+  // Only defines the helpers of black-formatter.js
+  runPython(code, { globals }) {
+    // Returning dict proxies, as `[key, value]` entries
+    const helper = (entries) =>
+      Object.assign(
+        (...args) => ({ toJs: ({ dict_converter }) => dict_converter(entries(...args)), destroy() {} }),
+        { destroy() {} }
+      );
+    globals.set(
+      'format_with_black',
+      helper((code) => {
+        const formatted = code.replace(/\s*=\s*/g, ' = ');
+        return [
+          ['success', true],
+          ['formatted', formatted],
+          ['changed', formatted !== code]
+        ];
+      })
+    );
+    globals.set('check_black_compatibility', helper(() => [['success', true]]));
+  }
+}
+
+// Runs python-tools-worker.js in this thread, its messages going through the event loop as a Worker's would
+class InThreadWorker {
+  constructor(scope) {
+    this.scope = scope;
+    scope.postMessage = (data) => setTimeout(() => this.onmessage({ data }));
+  }
+
+  postMessage(data) {
+    setTimeout(() => this.scope.onmessage({ data }));
+  }
+
+  terminate() {}
+}
+
+describe('Python tools worker', () => {
+  let client;
+
+  beforeAll(async () => {
+    window.loadPyodide = async () => new FakePyodide();
+    const scope = {};
+    Object.defineProperty(globalThis, 'self', { value: scope, configurable: true, writable: true });
+    await import('../../lib/python-tools-worker.js');
+    client = new PythonToolsClient(new InThreadWorker(scope));
+  });
+
+  it('should run a tool and send its result back', async () => {
+    const result = await client.formatWithBlack('x  =1\n');
+
+    expect(result.success).toBe(true);
+    expect(result.formatted).toBe('x = 1\n');
+    expect(result.changed).toBe(true);
+  });
+
+  it('should send errors back, and keep answering afterwards', async () => {
+    await expect(client.request('formatWithRuff', ['x = 1\n'])).rejects.toThrow('Unknown tool: formatWithRuff');
+    expect((await client.formatWithBlack('y=2\n')).formatted).toBe('y = 2\n');
+  });
+});
@@ -0,0 +1,81 @@
+import { describe, it, expect } from 'vitest';
+import { applyEdits, lineStarts, offsetConverter } from '../../lib/ruff-edits.js';
+
+const edit = (startRow, startCol, endRow, endCol, content) => ({ startRow, startCol, endRow, endCol, content });
+
+// Fastest of a few runs of `run`, in milliseconds, to keep scheduling noise out of the ratios below
+function fastest(run) {
+  let best = Infinity;
+  for (let attempt = 0; attempt < 5; attempt++) {
+    const start = performance.now();
+    run();
+    best = Math.min(best, performance.now() - start);
+  }
+  return best;
+}
+
+// Linear work takes about 4 times as long for 4 times the size, quadratic work about 16 times:
+// a ratio rather than a time limit, which would depend on the machine and its load
+function expectLinear(run, size) {
+  const ratio = fastest(() => run(size * 4)) / fastest(() => run(size));
+  expect(ratio).toBeLessThan(10);
+}
+
+describe('Ruff fix edits', () => {
+  it('should convert UTF-8 columns to string offsets', () => {
+    const code = 'x = "é"\ny = "😀" + z\n';
+    const toOffset = offsetConverter(code);
+
+    expect(toOffset(1, 5)).toBe(4);
+    // "é" is 2 UTF-8 bytes for 1 code unit, "😀" 4 bytes for 2 code units
+    expect(toOffset(1, 8)).toBe(6);
+    expect(code.slice(toOffset(2, 14))).toBe('z\n');
+    expect(toOffset(3, 1)).toBe(code.length);
+    // Going back walks the line again
+    expect(toOffset(1, 8)).toBe(6);
+    expect(toOffset(1, 1)).toBe(0);
+  });
+
+  it('should split lines like Ruff', () => {
+    expect(lineStarts('a\r\nb\rc\nd')).toEqual([0, 3, 5, 7]);
+  });
+
+  it('should apply single and multi-line edits after non-ASCII text', () => {
+    const code = 'import os, sys\ns = "ü"; unused = 1\ndef f(\n    a,\n):\n    pass\n';
+    const edits = [
+      edit(3, 1, 5, 3, 'def f(a):'),
+      edit(2, 11, 2, 21, ''),
+      edit(1, 1, 1, 15, 'import sys')
+    ];
+
+    expect(applyEdits(code, edits)).toBe('import sys\ns = "ü"; \ndef f(a):\n    pass\n');
+  });
+
+  it('should keep the given order of insertions at the same position', () => {
+    expect(applyEdits('ab', [edit(1, 2, 1, 2, '1'), edit(1, 2, 1, 2, '2')])).toBe('a12b');
+  });
+
+  it('should apply edits on CRLF lines and at the end of the file', () => {
+    const code = 'import os\r\nx = "é"  \r\ny = 1';
+    const edits = [edit(3, 6, 3, 6, '\r\n'), edit(2, 9, 2, 11, ''), edit(1, 1, 2, 1, '')];
+
+    expect(applyEdits(code, edits)).toBe('x = "é"\r\ny = 1\r\n');
+  });
+
+  it('should stay linear with many edits', () => {
+    expectLinear((size) => {
+      const code = 'x = 1  \n'.repeat(size);
+      const edits = Array.from({ length: size }, (_, row) => edit(row + 1, 6, row + 1, 8, ''));
+      expect(applyEdits(code, edits)).toBe('x = 1\n'.repeat(size));
+    }, 20000);
+  });
+
+  it('should stay linear with many edits on one long line', () => {
+    expectLinear((size) => {
+      const code = 'é = 1;  '.repeat(size);
+      // 9 UTF-8 bytes per repetition, "é" being 2
+      const edits = Array.from({ length: size }, (_, index) => edit(1, index * 9 + 8, 1, index * 9 + 10, ''));
+      expect(applyEdits(code, edits)).toBe('é = 1;'.repeat(size));
+    }, 10000);
+  });
+});
@@ -0,0 +1,60 @@
+import { describe, it, expect, beforeAll } from 'vitest';
+import { formatWithShed, releaseShed } from '../../lib/shed-formatter-bundle.js';
+
+// Stands in for Pyodide, logging package installs and the runs of Shed's setup and release
+class FakePyodide {
+  constructor() {
+    this.log = [];
+    this.loadedPackages = {};
+    this.FS = { mkdirTree() {}, writeFile() {} };
+  }
+
+  async loadPackage() {}
+
+  pyimport() {
+    return { install: async (names) => this.log.push(`install ${names.join(', ')}`), destroy() {} };
+  }
+
+  // Lists stay arrays, dicts become Map-like namespaces
+  toPy(value) {
+    const converted = Array.isArray(value) ? value : new Map(Object.entries(value));
+    return Object.assign(converted, { destroy() {} });
+  }
+
+  runPython(code, { globals } = {}) {
+    if (code.includes('sysconfig')) return '/lib/python3.13/site-packages';
+    this.log.push('setup');
+    const helper = (name) => Object.assign(() => this.log.push(name), { destroy() {} });
+    globals.set('format_with_shed', helper('format'));
+    globals.set('release_shed', helper('release'));
+  }
+}
+
+describe('Shed formatter initialization', () => {
+  let pyodide;
+
+  beforeAll(() => {
+    pyodide = new FakePyodide();
+    window.loadPyodide = async () => pyodide;
+  });
+
+  // Formatting itself fails without Ruff WASM, after the setup
+  it('should set Shed up once for concurrent first calls', async () => {
+    await Promise.all([formatWithShed('x = 1\n'), formatWithShed('y = 2\n')]);
+
+    expect(pyodide.log).toEqual(['install black, com2ann, libcst, pyupgrade', 'setup']);
+  });
+
+  it('should release once, and set Shed up again afterwards', async () => {
+    await Promise.all([releaseShed(), releaseShed()]);
+    await formatWithShed('x = 1\n');
+
+    expect(pyodide.log).toEqual([
+      'install black, com2ann, libcst, pyupgrade',
+      'setup',
+      'release',
+      'install black, com2ann, libcst, pyupgrade',
+      'setup'
+    ]);
+  });
+});
@@ -0,0 +1,144 @@
+// Vite plugin vendoring the Python tools' assets next to the build, for `npm run build:*:offline`
+// Everything the libs would otherwise fetch from jsdelivr and PyPI at runtime goes to `<outDir>/python-assets/`:
+// - pyodide/: the Pyodide runtime (from node_modules/pyodide) and the Pyodide packages needed
+// - pyodide/wheels/: the pure-Python wheels pinned in python-assets.lock.json, from PyPI
+// - ruff/: Ruff WASM (from node_modules/@astral-sh/ruff-wasm-web)
+// - manifest.json: the files to load for each requirement, see lib/python-assets.js
+// Downloads are checked against their sha256 and cached in node_modules/.cache/python-assets/.
+
+import { createHash } from 'crypto';
+import { copyFileSync, existsSync, mkdirSync, readFileSync, readdirSync, writeFileSync } from 'fs';
+import { join, resolve } from 'path';
+
+export const ASSETS_DIR = 'python-assets';
+
+const sha256 = (data) => createHash('sha256').update(data).digest('hex');
+
+// Name normalization of PEP 503, e.g. `mypy_extensions` and `mypy-extensions` are the same
+const normalize = (name) => name.toLowerCase().replace(/[-_.]+/g, '-');
+
+async function download(url, expectedSha256, cacheDir) {
+  const cached = join(cacheDir, expectedSha256);
+  if (existsSync(cached)) {
+    return readFileSync(cached);
+  }
+  const response = await fetch(url);
+  if (!response.ok) {
+    throw new Error(`Failed to download ${url}: ${response.status} ${response.statusText}`);
+  }
+  const data = Buffer.from(await response.arrayBuffer());
+  if (sha256(data) !== expectedSha256) {
+    throw new Error(`sha256 mismatch for ${url}`);
+  }
+  mkdirSync(cacheDir, { recursive: true });
+  writeFileSync(cached, data);
+  return data;
+}
+
+// The pure-Python wheel of `name==version` on PyPI, or `null` when there is none (compiled packages)
+async function findPureWheel(name, version) {
+  const response = await fetch(`https://pypi.org/pypi/${name}/${version}/json`);
+  if (!response.ok) {
+    throw new Error(`${name}==${version} not found on PyPI: ${response.status}`);
+  }
+  const { urls } = await response.json();
+  const wheel = urls.find((file) => file.packagetype === 'bdist_wheel' && file.filename.endsWith('-none-any.whl'));
+  return wheel ? { url: wheel.url, fileName: wheel.filename, sha256: wheel.digests.sha256 } : null;
+}
+
+// `names` and their dependencies in the Pyodide lock, dependencies first
+function pyodideClosure(names, pyodideLock) {
+  const closure = [];
+  const visit = (name) => {
+    const key = normalize(name);
+    if (!pyodideLock.packages[key]) {
+      throw new Error(`${name} is neither a pure-Python wheel nor a Pyodide package`);
+    }
+    if (closure.includes(key)) return;
+    pyodideLock.packages[key].depends.forEach(visit);
+    closure.push(key);
+  };
+  names.forEach(visit);
+  return closure;
+}
+
+export default function pythonAssets({ lockfile, nodeModules }) {
+  let outDir;
+  return {
+    name: 'python-assets',
+    apply: 'build',
+
+    configResolved(config) {
+      outDir = resolve(config.root, config.build.outDir);
+    },
+
+    async writeBundle() {
+      const lockText = readFileSync(lockfile, 'utf-8');
+      const lock = JSON.parse(lockText);
+      const cacheDir = join(nodeModules, '.cache', ASSETS_DIR);
+      const target = join(outDir, ASSETS_DIR);
+      const pyodideTarget = join(target, 'pyodide');
+      mkdirSync(join(pyodideTarget, 'wheels'), { recursive: true });
+
+      // Pinned versions have to be the installed ones, as the runtime files come from node_modules
+      const pyodideModule = join(nodeModules, 'pyodide');
+      const ruffModule = join(nodeModules, '@astral-sh', 'ruff-wasm-web');
+      for (const [module, version] of [[pyodideModule, lock.pyodide], [ruffModule, lock.ruffWasm]]) {
+        const installed = JSON.parse(readFileSync(join(module, 'package.json'), 'utf-8')).version;
+        if (installed !== version) {
+          throw new Error(`${module} is ${installed} but python-assets.lock.json pins ${version}, update one of them`);
+        }
+      }
+
+      console.log(`📦 Vendoring Pyodide ${lock.pyodide} and Ruff WASM ${lock.ruffWasm}...`);
+      for (const file of readdirSync(pyodideModule)) {
+        if (/^(pyodide\.(js|mjs|asm\.js|asm\.wasm)|pyodide-lock\.json|python_stdlib\.zip)$/.test(file)) {
+          copyFileSync(join(pyodideModule, file), join(pyodideTarget, file));
+        }
+      }
+      mkdirSync(join(target, 'ruff'), { recursive: true });
+      for (const file of ['ruff_wasm.js', 'ruff_wasm_bg.wasm']) {
+        copyFileSync(join(ruffModule, file), join(target, 'ruff', file));
+      }
+
+      // Each requirement gets wheel paths (relative to pyodide/) and Pyodide package names, in loading order
+      const pyodideLock = JSON.parse(readFileSync(join(pyodideModule, 'pyodide-lock.json'), 'utf-8'));
+      const pyodideCDN = `https://cdn.jsdelivr.net/pyodide/v${lock.pyodide}/full/`;
+      const pyodidePackages = new Set(pyodideClosure(['micropip'], pyodideLock));
+      const requirements = {};
+      for (const [requirement, pins] of Object.entries(lock.requirements)) {
+        const files = [];
+        const fromPyodide = [];
+        for (const pin of pins) {
+          const [name, version] = pin.split('==');
+          const wheel = await findPureWheel(name, version);
+          if (wheel) {
+            const data = await download(wheel.url, wheel.sha256, cacheDir);
+            writeFileSync(join(pyodideTarget, 'wheels', wheel.fileName), data);
+            files.push(`wheels/${wheel.fileName}`);
+          } else {
+            // Compiled packages (e.g. libcst, pyyaml) can only come from the Pyodide distribution
+            const entry = pyodideLock.packages[normalize(name)];
+            if (entry && entry.version !== version) {
+              console.warn(`⚠️ ${pin} has no pure-Python wheel, using Pyodide's ${entry.name} ${entry.version}`);
+            }
+            fromPyodide.push(name);
+          }
+        }
+        const closure = pyodideClosure(fromPyodide, pyodideLock);
+        closure.forEach((name) => pyodidePackages.add(name));
+        requirements[requirement] = [...closure, ...files];
+      }
+
+      for (const name of pyodidePackages) {
+        const { file_name: fileName, sha256: expectedSha256 } = pyodideLock.packages[name];
+        const data = await download(`${pyodideCDN}${fileName}`, expectedSha256, cacheDir);
+        writeFileSync(join(pyodideTarget, fileName), data);
+      }
+
+      const manifest = { lockHash: sha256(lockText), pyodide: lock.pyodide, requirements };
+      writeFileSync(join(target, 'manifest.json'), JSON.stringify(manifest, null, 2) + '\n');
+      console.log(`✅ Python assets vendored in ${target}`);
+    },
+  };
+}
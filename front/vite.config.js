@@ -1,9 +1,24 @@
 import { defineConfig } from 'vitest/config'
 import react from '@vitejs/plugin-react'
 import { resolve } from 'path'
+import pythonAssets, { ASSETS_DIR } from './vite-python-assets.js'
+
+const isLib = process.env.BUILD_MODE === 'lib'
+// Offline builds vendor Pyodide, the wheels and Ruff WASM instead of fetching them from CDNs at runtime
+const isOffline = process.env.PYTHON_ASSETS === 'local'
 
 export default defineConfig({
-  plugins: [react()],
+  plugins: [
+    react(),
+    ...(isOffline ? [pythonAssets({
+      lockfile: resolve(__dirname, 'python-assets.lock.json'),
+      nodeModules: resolve(__dirname, 'node_modules')
+    })] : [])
+  ],
+  // Path of the vendored assets relative to the built chunks: the lib is at the root of dist/, app chunks in dist/assets/
+  define: isOffline ? {
+    __PYTHON_ASSETS__: JSON.stringify(`${isLib ? '.' : '..'}/${ASSETS_DIR}/`)
+  } : {},
   resolve: {
     alias: {
       '@vendor': resolve(__dirname, '../vendor')
@@ -15,7 +30,7 @@ export default defineConfig({
   },
   build: {
     // Build mode can be switched based on environment
-    ...(process.env.BUILD_MODE === 'lib' ? {
+    ...(isLib ? {
       // Library mode - for bundling shed-formatter only
       lib: {
         entry: resolve(__dirname, 'lib/shed-formatter-bundle.js'),
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark the latency and throughput of tool configurations.
+"""
+
+import math
+import argparse
+import statistics
+from contextlib import nullcontext
+from pathlib import Path
+
+from compare_configurations import find_corpus_files
+from configurations import (
+    BACKENDS,
+    CONFIGURATIONS,
+    add_selection_arguments,
+    clear_tool_caches,
+    parse_selection,
+)
+from run_report import RunReport, measure
+
+TEST_FILE = Path(__file__).parent.parent / "test_files" / "broken_python.py"
+DEFAULT_CORPUS = Path(__file__).parent.parent / "test_files" / "shed_inputs"
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile, which stays an actual measurement on small sample counts."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def time_configuration(configuration, code, warmup, repeat):
+    """Measure `repeat` runs of `configuration` over `code`, after `warmup` unmeasured runs.
+
+    Returns the output and the `run_report.measure` metrics of every measured run.
+    """
+    run = BACKENDS[configuration.backend].run
+    for _ in range(warmup):
+        clear_tool_caches()
+        run(code, *configuration.args)
+    samples = []
+    for _ in range(repeat):
+        clear_tool_caches()
+        output, metrics = measure(run, code, *configuration.args)
+        samples.append(metrics)
+    return output, samples
+
+
+def summarize(timings, code):
+    """Statistics over the timings of one configuration on one input."""
+    median = statistics.median(timings)
+    return {
+        "min": min(timings),
+        "median": median,
+        "p95": percentile(timings, 0.95),
+        "chars_per_second": len(code) / median if median else float("inf"),
+        "lines_per_second": len(code.splitlines()) / median if median else float("inf"),
+    }
+
+
+def print_row(name, stats):
+    print(
+        f"   {name:<28} {stats['min'] * 1000:9.1f}ms {stats['median'] * 1000:9.1f}ms {stats['p95'] * 1000:9.1f}ms"
+        f" {stats['chars_per_second']:12,.0f} {stats['lines_per_second']:10,.0f}"
+    )
+
+
+def print_header():
+    print(f"   {'Configuration':<28} {'min':>11} {'median':>11} {'p95':>11} {'chars/s':>12} {'lines/s':>10}")
+
+
+def main(inputs, configurations=CONFIGURATIONS, warmup=1, repeat=5, report=None):
+    """Benchmark `configurations` on `inputs`, a list of `(display name, path)`.
+
+    With a `report`, one record per configuration and input is written to it, with median
+    wall and CPU times.
+    """
+    print(f"⏱️ Benchmarking {len(configurations)} configurations on {len(inputs)} input(s)"
+          f" ({warmup} warmup, {repeat} timed runs each)")
+
+    # Per configuration: total chars, total lines, summed medians, for the overall throughput
+    totals = {configuration.name: [0, 0, 0.0] for configuration in configurations}
+    failures = []
+    for input_name, path in inputs:
+        code = path.read_text()
+        print()
+        print(f"📄 {input_name} ({len(code)} chars, {len(code.splitlines())} lines)")
+        print_header()
+        for configuration in configurations:
+            name = configuration.name
+            versions = BACKENDS[configuration.backend].fingerprint()
+            try:
+                output, samples = time_configuration(configuration, code, warmup, repeat)
+            except Exception as error:
+                failures.append(f"  ❌ {input_name}: {name}: {type(error).__name__}: {error}")
+                print(f"   {name:<28} failed")
+                if report:
+                    report.record(input_name, code, configuration, versions, None, f"{type(error).__name__}: {error}")
+                continue
+            timings = [sample["wall_seconds"] for sample in samples]
+            stats = summarize(timings, code)
+            print_row(name, stats)
+            if report:
+                metrics = {
+                    "wall_seconds": stats["median"],
+                    "cpu_seconds": statistics.median(sample["cpu_seconds"] for sample in samples),
+                    "peak_rss_bytes": max(sample["peak_rss_bytes"] for sample in samples),
+                    "subprocesses": samples[-1]["subprocesses"],
+                    "subprocess_cpu_seconds": statistics.median(sample["subprocess_cpu_seconds"] for sample in samples),
+                    "subprocess_peak_rss_bytes": max(sample["subprocess_peak_rss_bytes"] or 0 for sample in samples)
+                                                 or None,
+                }
+                report.record(input_name, code, configuration, versions, output, metrics=metrics,
+                              min_seconds=stats["min"], p95_seconds=stats["p95"], samples=timings, warmup=warmup)
+            totals[name][0] += len(code)
+            totals[name][1] += len(code.splitlines())
+            totals[name][2] += stats["median"]
+
+    if len(inputs) > 1:
+        print()
+        print("📊 Overall throughput (sum of medians over all inputs):")
+        print(f"   {'Configuration':<28} {'total':>11} {'chars/s':>12} {'lines/s':>10}")
+        for name, (chars, lines, seconds) in totals.items():
+            if seconds:
+                print(f"   {name:<28} {seconds * 1000:9.1f}ms {chars / seconds:12,.0f} {lines / seconds:10,.0f}")
+
+    if failures:
+        print()
+        print("⚠️ Some configurations failed:")
+        for failure in failures:
+            print(failure)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", metavar="PATH", default=str(DEFAULT_CORPUS),
+                        help="also benchmark every file of a directory (or glob) (default: test_files/shed_inputs)")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before measuring (default: 1)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per measurement (default: 5)")
+    parser.add_argument("--report", metavar="PATH",
+                        help="append a JSONL record per configuration and input (output hash and size, "
+                             "median wall and CPU time, peak memory, tool versions)")
+    add_selection_arguments(parser)
+    args = parser.parse_args()
+    configurations = parse_selection(parser, args)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    corpus_root, corpus_files = find_corpus_files(args.corpus)
+    inputs = [(TEST_FILE.name, TEST_FILE)] + [(path.relative_to(corpus_root), path) for path in corpus_files]
+    if not corpus_files:
+        print(f"ℹ️ No corpus files in {args.corpus}, benchmarking {TEST_FILE.name} only (see make extract-shed-inputs)")
+    with RunReport(args.report, "benchmark") if args.report else nullcontext() as report:
+        if report:
+            print(f"🧾 Appending run records to {args.report}")
+        main(inputs, configurations, warmup=args.warmup, repeat=args.repeat, report=report)
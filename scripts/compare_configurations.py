@@ -3,82 +3,404 @@
 Compare different tool configurations to show their distinct behaviors.
 """
 
+import os
 import sys
-import subprocess
-import black
+import glob
+import json
+import argparse
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from itertools import chain
+from collections import Counter
 from pathlib import Path
 
-def main(verify_only=False):
-    test_file = Path(__file__).parent.parent / "test_files" / "broken_python.py"
+from configurations import (
+    BACKENDS,
+    CONFIGURATIONS,
+    add_selection_arguments,
+    clear_tool_caches,
+    configuration_key,
+    parse_selection,
+    run_configuration,
+)
+from equivalence import group_by_content, similarity_report
+from shed_stages import STAGES, format_stage_report
+from profiling import profile_run
+from result_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_SIZE, ResultCache
+from run_report import RunReport, format_metrics, measure
+
+TEST_FILE = Path(__file__).parent.parent / "test_files" / "broken_python.py"
+CORPUS_OUTPUTS = Path(__file__).parent.parent / "test_files" / "corpus_outputs"
+DEFAULT_BATCH_SIZE = 256
+
+
+def run_configurations(code, configurations, jobs=1, cache=None, report=None, input_name=None, trace_memory=False):
+    """Run `configurations` over `code`, returning outputs in the same order.
+
+    With `jobs > 1`, configurations run on a pool of at most `jobs` worker processes, the Shed
+    ones all on the same worker so that they still share their Black and Ruff stages.
+    Progress is still reported in configuration order once everything has finished,
+    so the report is identical whatever the scheduling was.
+    With a `cache`, only configurations without a cached output are run.
+    With a `report`, one record per configuration is written to it for `input_name`.
+    With `trace_memory`, the tracemalloc peaks of in-process tools are measured too.
+    """
+    keys = [configuration_key(configuration, code) for configuration in configurations] if cache else []
+    results = [cache.get(key) for key in keys] if cache else [None] * len(configurations)
+    cached = [result is not None for result in results]
+    stages = [None] * len(configurations)
+    metrics = [None] * len(configurations)
+
+    def print_result(index):
+        print(f"   Result: {len(results[index])} chars{' (cached)' if cached[index] else ''}")
+        if stages[index]:
+            print(f"   Stages: {format_stage_report(stages[index])}")
+        if metrics[index]:
+            print(f"   Resources: {format_metrics(metrics[index])}")
+
+    if jobs <= 1:
+        for index, configuration in enumerate(configurations):
+            print(configuration.message)
+            if not cached[index]:
+                results[index], stages[index], metrics[index] = run_configuration(configuration.name, code, trace_memory)
+            print_result(index)
+    else:
+        missing = [index for index in range(len(configurations)) if not cached[index]]
+        shed = [index for index in missing if configurations[index].backend == "shed"]
+        groups = [[index] for index in missing if index not in shed] + ([shed] if shed else [])
+        if groups:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(groups))) as executor:
+                futures = {tuple(group): executor.submit(run_configuration_group,
+                                                         [configurations[index].name for index in group],
+                                                         code, trace_memory)
+                           for group in groups}
+                for group, future in futures.items():
+                    for index, result in zip(group, future.result()):
+                        results[index], stages[index], metrics[index] = result
+        for index, configuration in enumerate(configurations):
+            print(configuration.message)
+            print_result(index)
+
+    for key, result, was_cached in zip(keys, results, cached):
+        if not was_cached:
+            cache.put(key, result)
+    if report:
+        for configuration, result, stage_report, run_metrics in zip(configurations, results, stages, metrics):
+            versions = BACKENDS[configuration.backend].fingerprint()
+            extra = {"stages": stage_report} if stage_report else {}
+            report.record(input_name, code, configuration, versions, result, metrics=run_metrics, **extra)
+    return results
+
+
+def run_configuration_group(names, code, trace_memory=False):
+    """Run the configurations called `names` one after the other in the same process."""
+    return [run_configuration(name, code, trace_memory) for name in names]
+
+
+def find_corpus_files(corpus):
+    """Return `(root, files)` for a corpus given as a directory or a glob pattern.
+
+    Hidden files (e.g. the manifest of extract_shed_inputs.py) are skipped, as globs do.
+    """
+    corpus_dir = Path(corpus)
+    if corpus_dir.is_dir():
+        return corpus_dir, sorted(
+            path for path in corpus_dir.rglob("*")
+            if path.is_file() and not any(part.startswith(".") for part in path.relative_to(corpus_dir).parts)
+        )
+    files = sorted(Path(match) for match in glob.glob(corpus, recursive=True) if Path(match).is_file())
+    if not files:
+        return corpus_dir.parent, []
+    return Path(os.path.commonpath([str(path.parent) for path in files])), files
+
+
+def run_corpus_input(position, code, names, trace_memory=False):
+    """Run the configurations called `names` over one corpus input.
+
+    Returns `(position, outputs, errors, stages, metrics)` as `{name: ...}` dicts, a failing
+    tool giving `None` as output and its error message, so one broken input can't stop the corpus.
+    `stages` only has the Shed stage reports.
+    """
+    outputs, errors, stages, metrics = {}, {}, {}, {}
+    for name in names:
+        try:
+            (outputs[name], stage_report, metrics[name]), errors[name] = run_configuration(name, code, trace_memory), None
+        except Exception as error:
+            outputs[name], errors[name], stage_report = None, f"{type(error).__name__}: {error}", None
+            metrics[name] = {}
+        if stage_report:
+            stages[name] = stage_report
+    return position, outputs, errors, stages, metrics
+
+
+def run_corpus_batch(configuration, codes):
+    """Run one batchable configuration over many corpus inputs, returning `(outputs, errors, metrics)`.
+
+    `metrics` are the ones of the whole batch.
+    """
+    try:
+        outputs, metrics = measure(BACKENDS[configuration.backend].batch, codes, *configuration.args)
+        return outputs, [None] * len(codes), {**metrics, "files": len(codes)}
+    except Exception as error:
+        return [None] * len(codes), [f"{type(error).__name__}: {error}"] * len(codes), {}
+
+
+def stream_corpus(files, configurations, jobs=1, batch_size=0, cache=None, trace_memory=False):
+    """Yield `(path, outputs, errors, stages, metrics)` for every corpus file as they finish.
+
+    Outputs, errors, stages and metrics are `{configuration name: ...}` dicts, stages only
+    holding the Shed stage reports of the configurations that actually ran. Metrics are the
+    `run_report.measure` ones, `None` for cached outputs, and `{"batch": metrics}` with the
+    metrics of the whole batch for batched configurations.
+
+    Files are read `batch_size` (or `DEFAULT_BATCH_SIZE`) at a time, and only the
+    configurations missing from the `cache` are run. With a `batch_size`, configurations
+    whose backend supports it run once per batch, concurrently with the per-file
+    configurations, which keep at most a few files in flight.
+    """
+    batchable = [configuration for configuration in configurations
+                 if batch_size and BACKENDS[configuration.backend].batch is not None]
+    chunk_size = batch_size or DEFAULT_BATCH_SIZE
+
+    with (ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else nullcontext()) as executor:
+        for start in range(0, len(files), chunk_size):
+            chunk = files[start:start + chunk_size]
+            codes = [path.read_text() for path in chunk]
+            outputs = [{} for _ in chunk]
+            errors = [{} for _ in chunk]
+            keys = [{} for _ in chunk]
+            todo = [[] for _ in chunk]
+            for position, code in enumerate(codes):
+                for configuration in configurations:
+                    name = configuration.name
+                    outputs[position][name] = errors[position][name] = None
+                    if cache:
+                        keys[position][name] = configuration_key(configuration, code)
+                        outputs[position][name] = cache.get(keys[position][name])
+                    if outputs[position][name] is None:
+                        todo[position].append(name)
+
+            batch_positions = {configuration: [position for position in range(len(chunk))
+                                               if configuration.name in todo[position]]
+                               for configuration in batchable}
+            batch_positions = {configuration: positions for configuration, positions in batch_positions.items()
+                               if positions}
+            batch_offsets = {configuration.name: {position: offset for offset, position in enumerate(positions)}
+                             for configuration, positions in batch_positions.items()}
+            per_file = [(position, codes[position], [name for name in names if name not in batch_offsets], trace_memory)
+                        for position, names in enumerate(todo)]
+            if executor is None:
+                batches = {configuration.name: run_corpus_batch(configuration, [codes[p] for p in positions])
+                           for configuration, positions in batch_positions.items()}
+                finished = (run_corpus_input(*arguments) for arguments in per_file)
+            else:
+                batch_futures = {
+                    configuration.name: executor.submit(run_corpus_batch, configuration, [codes[p] for p in positions])
+                    for configuration, positions in batch_positions.items()
+                }
+                finished = chain(
+                    (run_corpus_input(*arguments) for arguments in per_file if not arguments[2]),
+                    map_unordered(executor, run_corpus_input, [arguments for arguments in per_file if arguments[2]], jobs * 2),
+                )
+                batches = None
+
+            for position, file_outputs, file_errors, file_stages, file_metrics in finished:
+                if batches is None:
+                    batches = {name: future.result() for name, future in batch_futures.items()}
+                for name, (batch_outputs, batch_errors, batch_metrics) in batches.items():
+                    offset = batch_offsets[name].get(position)
+                    if offset is not None:
+                        file_outputs[name], file_errors[name] = batch_outputs[offset], batch_errors[offset]
+                        file_metrics[name] = {"batch": batch_metrics}
+                for name, output in file_outputs.items():
+                    outputs[position][name], errors[position][name] = output, file_errors[name]
+                    if cache and output is not None:
+                        cache.put(keys[position][name], output)
+                file_metrics = {name: file_metrics.get(name) for name in outputs[position]}
+                yield chunk[position], outputs[position], errors[position], file_stages, file_metrics
+                codes[position] = outputs[position] = errors[position] = None
+
+
+def map_unordered(executor, function, arguments, max_in_flight):
+    """Yield `function(*arguments)` for every item of `arguments` as they finish, with a bounded number in flight."""
+    pending = set()
+    for item in arguments:
+        pending.add(executor.submit(function, *item))
+        if len(pending) >= max_in_flight:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    for future in as_completed(pending):
+        yield future.result()
+
+
+def corpus_main(corpus, corpus_outputs, configurations=CONFIGURATIONS, verify_only=False, jobs=1,
+                batch_size=DEFAULT_BATCH_SIZE, cache=None, report=None, trace_memory=False):
+    """Run `configurations` over every file of a corpus.
+
+    Outputs go to one reference tree per configuration, `corpus_outputs/<name>/<relative path>`.
+    A configuration failing on an input has no reference file for it.
+    With a `report`, one record per configuration and file is written to it.
+    """
+    root, files = find_corpus_files(corpus)
+    corpus_outputs = Path(corpus_outputs)
+
+    print("🔧 Testing Different Tool Configurations on a corpus:")
+    print(f"📁 Corpus: {corpus} ({len(files)} files)")
+    if jobs > 1:
+        print(f"⚙️ Running on {jobs} worker processes")
+    if batch_size:
+        print(f"📦 Batching Ruff invocations by {batch_size} files")
+    print()
+    if not files:
+        print("❌ No input files found")
+        sys.exit(1)
+
+    mismatches = []
+    failures = 0
+    results = stream_corpus(files, configurations, jobs=jobs, batch_size=batch_size, cache=cache,
+                            trace_memory=trace_memory)
+    stage_totals = {}  # Configuration name -> Counter of stage times, reused stages and dominant stages
+    memory_peaks = {}  # (Configuration name, metric) -> (peak bytes, where it was reached)
+    for done, (path, outputs, errors, stages, metrics) in enumerate(results, start=1):
+        for name, stage_report in stages.items():
+            totals = stage_totals.setdefault(name, Counter())
+            totals.update({stage: stage_report[stage] for stage in STAGES})
+            totals["reused"] += stage_report["reused"]
+            totals[f"dominated by {stage_report['dominant']}"] += 1
+        relative_path = path.relative_to(root)
+        for name, file_metrics in metrics.items():
+            batch_metrics = (file_metrics or {}).get("batch")
+            where = f"the batch of {batch_metrics['files']} files with {relative_path}" if batch_metrics else relative_path
+            for metric in ("traced_peak_bytes", "subprocess_peak_rss_bytes"):
+                value = (batch_metrics or file_metrics or {}).get(metric)
+                if value is not None and value > memory_peaks.get((name, metric), (-1,))[0]:
+                    memory_peaks[name, metric] = (value, where)
+        if report:
+            code = path.read_text()
+            for configuration in configurations:
+                name = configuration.name
+                extra = {"stages": stages[name]} if name in stages else {}
+                report.record(relative_path, code, configuration, BACKENDS[configuration.backend].fingerprint(),
+                              outputs[name], errors[name], metrics[name], **extra)
+        file_mismatches = []
+        for configuration in configurations:
+            name = configuration.name
+            reference_file = corpus_outputs / name / relative_path
+            if errors[name] is not None:
+                failures += 1
+            if verify_only:
+                saved_content = reference_file.read_text() if reference_file.exists() else None
+                if outputs[name] != saved_content:
+                    file_mismatches.append(name)
+            elif outputs[name] is None:
+                reference_file.unlink(missing_ok=True)
+            else:
+                reference_file.parent.mkdir(parents=True, exist_ok=True)
+                reference_file.write_text(outputs[name])
+
+        status = "❌" if file_mismatches else "✅"
+        failed = [name for name, error in errors.items() if error is not None]
+        details = f" (differs: {', '.join(file_mismatches)})" if file_mismatches else ""
+        details += f" (failed: {', '.join(failed)})" if failed else ""
+        print(f"  {status} [{done}/{len(files)}] {relative_path}{details}")
+        mismatches.extend(f"  ❌ {relative_path}: {name}" for name in file_mismatches)
+
+    print()
+    for name, totals in stage_totals.items():
+        dominated = ", ".join(f"{key} in {count} run(s)" for key, count in totals.items() if key.startswith("dominated"))
+        time_split = ", ".join(f"{stage} {totals[stage]:.2f}s" for stage in STAGES)
+        print(f"🏠 {name} stages: {time_split}; {dominated}; {totals['reused']} stage(s) reused")
+    for (name, metric), (peak, where) in sorted(memory_peaks.items()):
+        kind = "traced peak" if metric == "traced_peak_bytes" else "subprocess peak RSS"
+        print(f"📈 {name} {kind}: {peak / 2**20:.1f}MB, on {where}")
+    if cache:
+        cache.prune()
+        print(f"🗃️ Cache: {cache.summary()}")
+    if failures:
+        print(f"⚠️ {failures} tool run(s) failed, see (failed: ...) above")
+    if not verify_only:
+        print(f"💾 Saved all configurations to {corpus_outputs}/")
+    elif mismatches:
+        print(f"❌ {len(mismatches)} corpus reference file(s) are outdated:")
+        for mismatch in mismatches:
+            print(mismatch)
+        print()
+        print("Run 'make generate-corpus-references' to update them.")
+        sys.exit(1)
+    else:
+        print("✅ All corpus reference files are up-to-date!")
+
+
+def profile_main(inputs, profile_dir, configurations=CONFIGURATIONS):
+    """Profile `configurations` on `inputs`, a list of `(display name, path)`, without touching references.
+
+    Writes `profile_dir/<configuration>/<input>.pstats` and `.collapsed` for every pair.
+    """
+    profile_dir = Path(profile_dir)
+    print(f"🔬 Profiling {len(configurations)} configurations on {len(inputs)} input(s) with cProfile and tracemalloc")
+    failures = []
+    for input_name, path in inputs:
+        code = path.read_text()
+        print()
+        print(f"📄 {input_name} ({len(code)} chars)")
+        print(f"   {'Configuration':<28} {'profiled':>11} {'subprocess':>11} {'traced peak':>12}")
+        for configuration in configurations:
+            stem = profile_dir / configuration.name / input_name
+            try:
+                _, summary = profile_run(BACKENDS[configuration.backend].run, (code, *configuration.args), stem,
+                                         reset=clear_tool_caches)
+            except Exception as error:
+                failures.append(f"  ❌ {input_name}: {configuration.name}: {type(error).__name__}: {error}")
+                print(f"   {configuration.name:<28} failed")
+                continue
+            print(f"   {configuration.name:<28} {summary['seconds'] * 1000:9.1f}ms"
+                  f" {summary['subprocess_seconds'] * 1000:9.1f}ms {summary['traced_peak_bytes'] / 2**20:10.1f}MB")
+
+    print()
+    print(f"💾 Profiles written to {profile_dir}/ (.pstats for pstats or snakeviz, .collapsed for flamegraph tools)")
+    if failures:
+        print("⚠️ Some configurations failed:")
+        for failure in failures:
+            print(failure)
+
+
+def main(configurations=CONFIGURATIONS, verify_only=False, jobs=1, cache=None, similarity_json=None, report=None,
+         trace_memory=False):
+    test_file = TEST_FILE
     original_code = test_file.read_text()
     outputs_dir = Path(__file__).parent.parent / "test_files" / "outputs"
 
     print("🔧 Testing Different Tool Configurations:")
     print(f"📁 Original: {len(original_code)} chars")
+    if jobs > 1:
+        print(f"⚙️ Running on {min(jobs, len(configurations))} worker processes")
     print()
 
-    # 1. Ruff format only (should match Black)
-    print("1️⃣ Ruff format (Black-compatible)...")
-    result = subprocess.run(["ruff", "format", "--stdin-filename", "test.py"],
-                          input=original_code, encoding="utf-8", capture_output=True)
-    ruff_format_only = result.stdout
-    print(f"   Result: {len(ruff_format_only)} chars")
-
-    # 2. Black only
-    print("2️⃣ Black format...")
-    black_mode = black.Mode(target_versions={black.TargetVersion.PY39})
-    black_only = black.format_str(original_code, mode=black_mode)
-    print(f"   Result: {len(black_only)} chars")
-
-    # 3. Ruff check --fix-only (with limited rules, no import removal)
-    print("3️⃣ Ruff check --fix-only (no import removal)...")
-    result = subprocess.run([
-        "ruff", "check", "--select=E,W,F841", "--fix-only", "--exit-zero", "-"
-    ], input=original_code, encoding="utf-8", capture_output=True)
-    ruff_fix_no_imports = result.stdout
-    print(f"   Result: {len(ruff_fix_no_imports)} chars")
-
-    # 4. Ruff check --fix-only (with import removal)
-    print("4️⃣ Ruff check --fix-only (with import removal)...")
-    result = subprocess.run([
-        "ruff", "check", "--select=F401,F841,I", "--fix-only", "--exit-zero", "-"
-    ], input=original_code, encoding="utf-8", capture_output=True)
-    ruff_fix_with_imports = result.stdout
-    print(f"   Result: {len(ruff_fix_with_imports)} chars")
-
-    # 5. Shed formatting (both with and without refactor)
-    print("5️⃣ Shed format (no refactor)...")
-    import sys
-    sys.path.insert(0, str(Path(__file__).parent.parent / "vendor" / "shed" / "src"))
-    import shed as shed_module
-    shed_result_no_refactor = shed_module.shed(original_code, refactor=False)
-    print(f"   Result: {len(shed_result_no_refactor)} chars")
-
-    print("6️⃣ Shed format (with refactor)...")
-    shed_result_with_refactor = shed_module.shed(original_code, refactor=True)
-    print(f"   Result: {len(shed_result_with_refactor)} chars")
-
+    results = run_configurations(original_code, configurations, jobs=jobs, cache=cache, report=report,
+                                 input_name=test_file.relative_to(test_file.parent.parent), trace_memory=trace_memory)
+    if cache:
+        cache.prune()
+        print(f"🗃️ Cache: {cache.summary()}")
 
     print()
     print("📊 Comparison Results:")
-    print(f"📁 Original:                    {len(original_code):4d} chars")
-    print(f"🔧 Ruff format only:            {len(ruff_format_only):4d} chars")
-    print(f"🖤 Black only:                  {len(black_only):4d} chars")
-    print(f"⚡ Ruff fix (no imports):       {len(ruff_fix_no_imports):4d} chars")
-    print(f"🧹 Ruff fix (with imports):     {len(ruff_fix_with_imports):4d} chars")
-    print(f"🏠 Shed (no refactor):          {len(shed_result_no_refactor):4d} chars")
-    print(f"🏠 Shed (with refactor):        {len(shed_result_with_refactor):4d} chars")
+    print(f"📁 {'Original:':<29}{len(original_code):4d} chars")
+    for configuration, result in zip(configurations, results):
+        print(f"{configuration.emoji} {configuration.label + ':':<29}{len(result):4d} chars")
     print()
 
+    if similarity_json:
+        similarity = similarity_report({configuration.name: result for configuration, result in zip(configurations, results)})
+        Path(similarity_json).write_text(json.dumps(similarity, indent=2) + "\n")
+        print(f"📐 Similarity matrix written to {similarity_json}")
+        print()
+
     # Prepare outputs map
     outputs = {
-        "ruff_format_only.py": ruff_format_only,
-        "black_only.py": black_only,
-        "ruff_fix_no_imports.py": ruff_fix_no_imports,
-        "ruff_fix_with_imports.py": ruff_fix_with_imports,
-        "shed_format.py": shed_result_no_refactor,  # Default (matches WASM implementation)
-        "shed_format_no_refactor.py": shed_result_no_refactor,
-        "shed_format_with_refactor.py": shed_result_with_refactor,
+        filename: result
+        for configuration, result in zip(configurations, results)
+        for filename in configuration.filenames
     }
 
     if verify_only:
@@ -123,32 +445,10 @@ def main(verify_only=False):
     print("🔍 Verifying all outputs are unique...")
 
     # Build a map of all outputs with their names
-    all_outputs = {
-        "Ruff format only": ruff_format_only,
-        "Black only": black_only,
-        "Ruff fix (no imports)": ruff_fix_no_imports,
-        "Ruff fix (with imports)": ruff_fix_with_imports,
-        "Shed (no refactor)": shed_result_no_refactor,
-        "Shed (with refactor)": shed_result_with_refactor,
-    }
+    all_outputs = {configuration.label: result for configuration, result in zip(configurations, results)}
 
     # Find groups of identical outputs
-    matching_groups = []
-    seen = set()
-
-    for name1, content1 in all_outputs.items():
-        if name1 in seen:
-            continue
-
-        group = [name1]
-        for name2, content2 in all_outputs.items():
-            if name1 != name2 and name2 not in seen and content1 == content2:
-                group.append(name2)
-                seen.add(name2)
-
-        if len(group) > 1:
-            matching_groups.append(group)
-        seen.add(name1)
+    matching_groups = [group for group in group_by_content(all_outputs) if len(group) > 1]
 
     # Report results
     if matching_groups:
@@ -166,6 +466,54 @@ def main(verify_only=False):
 
 
 if __name__ == "__main__":
-    # Check for --verify flag
-    verify_only = "--verify" in sys.argv
-    main(verify_only=verify_only)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--verify", action="store_true",
+                        help="check test_files/outputs/ instead of regenerating it")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="run configurations on up to JOBS worker processes (default: 1, sequential), "
+                             "the Shed ones sharing a worker to reuse their stages")
+    parser.add_argument("--corpus", metavar="PATH",
+                        help="run over every file of a directory (or glob) instead of broken_python.py")
+    parser.add_argument("--corpus-outputs", metavar="DIR", default=str(CORPUS_OUTPUTS),
+                        help="reference tree for --corpus (default: test_files/corpus_outputs)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"with --corpus, run each Ruff configuration once per BATCH_SIZE files "
+                             f"(default: {DEFAULT_BATCH_SIZE}, 0 for one Ruff process per file)")
+    parser.add_argument("--cache-dir", metavar="DIR", default=str(DEFAULT_CACHE_DIR),
+                        help="where tool outputs are cached (default: .cache/references)")
+    parser.add_argument("--cache-max-size", metavar="MB", type=int, default=DEFAULT_MAX_SIZE // (1024 * 1024),
+                        help=f"evict least recently used outputs above this size "
+                             f"(default: {DEFAULT_MAX_SIZE // (1024 * 1024)})")
+    parser.add_argument("--no-cache", action="store_true", help="always run every tool")
+    parser.add_argument("--similarity-json", metavar="PATH",
+                        help="write identical groups and the pairwise line similarity of the outputs as JSON")
+    parser.add_argument("--report", metavar="PATH",
+                        help="append a JSONL record per configuration and input (output hash and size, "
+                             "wall and CPU time, peak memory, tool versions)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also measure the tracemalloc peak of Black and Shed runs (several times slower)")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="instead of generating or verifying references, profile every configuration with "
+                             "cProfile and tracemalloc, writing pstats and collapsed-stack files to DIR")
+    add_selection_arguments(parser)
+    args = parser.parse_args()
+    configurations = parse_selection(parser, args)
+    if args.profile:
+        if args.corpus:
+            corpus_root, corpus_files = find_corpus_files(args.corpus)
+            inputs = [(path.relative_to(corpus_root), path) for path in corpus_files]
+        else:
+            inputs = [(Path(TEST_FILE.name), TEST_FILE)]
+        profile_main(inputs, args.profile, configurations)
+        sys.exit(0)
+    cache = None if args.no_cache else ResultCache(args.cache_dir, args.cache_max_size * 1024 * 1024)
+    mode = "verify" if args.verify else "generate"
+    with RunReport(args.report, mode) if args.report else nullcontext() as report:
+        if report:
+            print(f"🧾 Appending run records to {args.report}")
+        if args.corpus:
+            corpus_main(args.corpus, args.corpus_outputs, configurations, verify_only=args.verify, jobs=args.jobs,
+                        batch_size=args.batch_size, cache=cache, report=report, trace_memory=args.trace_memory)
+        else:
+            main(configurations, verify_only=args.verify, jobs=args.jobs, cache=cache,
+                 similarity_json=args.similarity_json, report=report, trace_memory=args.trace_memory)
@@ -0,0 +1,237 @@
+"""
+Registry of the tool configurations compared against the browser implementations.
+
+Each configuration declares its backend, the backend arguments and its reference files.
+Backends import their tool when they first run, so that e.g. checking the Ruff references
+alone doesn't pay for importing Black, Shed, libcst and com2ann.
+"""
+
+import re
+import sys
+import hashlib
+import tempfile
+import subprocess
+from collections import namedtuple
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from importlib.metadata import version
+from pathlib import Path
+
+import subprocess_usage
+from result_cache import ResultCache
+from run_report import measure
+from shed_stages import ShedStages
+
+SHED_SRC = Path(__file__).parent.parent / "vendor" / "shed" / "src"
+# Black/Ruff stages of Shed runs, shared by every Shed configuration of this process
+SHED_STAGES = ShedStages()
+
+
+def ruff_format(code):
+    """Run `ruff format` over stdin."""
+    result = subprocess_usage.run(["ruff", "format", "--stdin-filename", "test.py"],
+                                  input=code, encoding="utf-8", capture_output=True)
+    return result.stdout
+
+
+def black_format(code, **options):
+    """Run Black in-process, `options` being extra `black.Mode` arguments."""
+    import black
+    black_mode = black.Mode(target_versions={black.TargetVersion.PY39}, **options)
+    return black.format_str(code, mode=black_mode)
+
+
+def ruff_fix(code, select):
+    """Run `ruff check --fix-only` over stdin with the given rule selection."""
+    result = subprocess_usage.run([
+        "ruff", "check", f"--select={select}", "--fix-only", "--exit-zero", "-"
+    ], input=code, encoding="utf-8", capture_output=True)
+    return result.stdout
+
+
+def shed_format(code, refactor):
+    """Run Shed in-process, preferring the vendored submodule."""
+    if str(SHED_SRC) not in sys.path:
+        sys.path.insert(0, str(SHED_SRC))
+    import shed as shed_module
+    return SHED_STAGES.shed(shed_module, code, refactor=refactor)
+
+
+def ruff_batch(command, codes):
+    """Run one `ruff` command over a temporary tree holding all `codes`, returning the rewritten files.
+
+    Returns the outputs in `codes` order, and the set of indices Ruff failed to parse.
+    Files are named by index so that they all get picked up, whatever the inputs' names were.
+    """
+    with tempfile.TemporaryDirectory(prefix="ruff-batch-") as batch_dir:
+        paths = [Path(batch_dir) / f"{index:06d}.py" for index in range(len(codes))]
+        for path, code in zip(paths, codes):
+            path.write_text(code, encoding="utf-8")
+        result = subprocess_usage.run([*command, "--no-cache", batch_dir], encoding="utf-8", capture_output=True)
+        unparsable = {Path(name).name for name in re.findall(r"Failed to parse (.+?):\d+:\d+:", result.stderr)}
+        outputs = [path.read_text(encoding="utf-8") for path in paths]
+    return outputs, {index for index, path in enumerate(paths) if path.name in unparsable}
+
+
+def ruff_format_batch(codes):
+    """Batched `ruff_format`: one `ruff format` process for all `codes`."""
+    outputs, unparsable = ruff_batch(["ruff", "format"], codes)
+    # Over stdin, an input Ruff can't parse gives an empty output
+    return ["" if index in unparsable else output for index, output in enumerate(outputs)]
+
+
+def ruff_fix_batch(codes, select):
+    """Batched `ruff_fix`: one `ruff check --fix-only` process for all `codes`."""
+    outputs, _ = ruff_batch([
+        "ruff", "check", f"--select={select}", "--fix-only", "--exit-zero", "--output-format", "json"
+    ], codes)
+    return outputs
+
+
+@lru_cache(maxsize=None)
+def ruff_fingerprint():
+    return subprocess.run(["ruff", "--version"], encoding="utf-8", capture_output=True).stdout.strip()
+
+
+@lru_cache(maxsize=None)
+def black_fingerprint():
+    return f"black {version('black')}"
+
+
+@lru_cache(maxsize=None)
+def shed_fingerprint():
+    """Shed's own version, from the vendored sources when they are there, plus everything it calls."""
+    vendored = sorted((SHED_SRC / "shed").glob("*.py"))
+    if vendored:
+        digest = hashlib.sha256(b"".join(path.read_bytes() for path in vendored)).hexdigest()
+        shed_version = f"shed vendor/shed@{digest[:16]}"
+    else:
+        shed_version = f"shed {version('shed')}"
+    dependencies = ", ".join(f"{package} {version(package)}" for package in ("libcst", "com2ann"))
+    return f"{shed_version} ({black_fingerprint()}, {ruff_fingerprint()}, {dependencies})"
+
+
+# run: `run(code, *args)` gives the output
+# batch: `batch(codes, *args)` gives the outputs of many inputs at once, `None` if not supported
+# fingerprint: identifies the installed tool, to invalidate cached outputs when it changes
+# in_process: whether the tool runs in this process, so that tracemalloc can trace its memory
+Backend = namedtuple("Backend", ["run", "batch", "fingerprint", "in_process"])
+
+BACKENDS = {
+    "ruff_format": Backend(ruff_format, ruff_format_batch, ruff_fingerprint, False),
+    "black": Backend(black_format, None, black_fingerprint, True),
+    "ruff_fix": Backend(ruff_fix, ruff_fix_batch, ruff_fingerprint, False),
+    "shed": Backend(shed_format, None, shed_fingerprint, True),
+}
+
+# name: identifies the configuration, and is its directory in corpus reference trees
+# filenames: its reference files in test_files/outputs/
+# emoji, label, message: how reports show it
+Configuration = namedtuple("Configuration", ["name", "backend", "args", "filenames", "emoji", "label", "message"])
+
+# Every configuration, in report order
+CONFIGURATIONS = [
+    Configuration(
+        name="ruff_format_only", backend="ruff_format", args=(),  # Should match Black
+        filenames=("ruff_format_only.py",),
+        emoji="🔧", label="Ruff format only", message="1️⃣ Ruff format (Black-compatible)...",
+    ),
+    Configuration(
+        name="black_only", backend="black", args=(),
+        filenames=("black_only.py",),
+        emoji="🖤", label="Black only", message="2️⃣ Black format...",
+    ),
+    Configuration(
+        name="ruff_fix_no_imports", backend="ruff_fix", args=("E,W,F841",),
+        filenames=("ruff_fix_no_imports.py",),
+        emoji="⚡", label="Ruff fix (no imports)", message="3️⃣ Ruff check --fix-only (no import removal)...",
+    ),
+    Configuration(
+        name="ruff_fix_with_imports", backend="ruff_fix", args=("F401,F841,I",),
+        filenames=("ruff_fix_with_imports.py",),
+        emoji="🧹", label="Ruff fix (with imports)", message="4️⃣ Ruff check --fix-only (with import removal)...",
+    ),
+    Configuration(
+        name="shed_format_no_refactor", backend="shed", args=(False,),
+        # shed_format.py is the default, matching the WASM implementation
+        filenames=("shed_format.py", "shed_format_no_refactor.py"),
+        emoji="🏠", label="Shed (no refactor)", message="5️⃣ Shed format (no refactor)...",
+    ),
+    Configuration(
+        name="shed_format_with_refactor", backend="shed", args=(True,),
+        filenames=("shed_format_with_refactor.py",),
+        emoji="🏠", label="Shed (with refactor)", message="6️⃣ Shed format (with refactor)...",
+    ),
+]
+CONFIGURATIONS_BY_NAME = {configuration.name: configuration for configuration in CONFIGURATIONS}
+
+
+def select_configurations(only=(), exclude=()):
+    """Configurations matching any `only` pattern (all by default) and no `exclude` pattern.
+
+    Patterns are configuration names, backend names, or shell-style wildcards over names.
+    Raises `ValueError` for a pattern that matches nothing, since that's always a typo.
+    """
+    def matches(configuration, pattern):
+        return configuration.backend == pattern or fnmatchcase(configuration.name, pattern)
+
+    for pattern in [*only, *exclude]:
+        if not any(matches(configuration, pattern) for configuration in CONFIGURATIONS):
+            raise ValueError(
+                f"{pattern!r} matches no configuration, expected a name among {list(CONFIGURATIONS_BY_NAME)} "
+                f"or a backend among {list(BACKENDS)}"
+            )
+    return [
+        configuration for configuration in CONFIGURATIONS
+        if (not only or any(matches(configuration, pattern) for pattern in only))
+        and not any(matches(configuration, pattern) for pattern in exclude)
+    ]
+
+
+def clear_tool_caches():
+    """Forget memoized results, so that repeated runs over the same input measure actual work."""
+    shed_module = sys.modules.get("shed")
+    if shed_module is not None:
+        shed_module.shed.cache_clear()  # `shed.shed` is an `lru_cache`
+    SHED_STAGES.clear()
+
+
+def run_configuration(name, code, trace_memory=False):
+    """Run a single configuration; top-level so that it can be sent to a worker process.
+
+    Returns `(output, stages, metrics)`, `stages` being the Shed stage report for Shed
+    configurations and `metrics` the `run_report.measure` ones. With `trace_memory`,
+    in-process tools run under tracemalloc, several times slower.
+    """
+    configuration = CONFIGURATIONS_BY_NAME[name]
+    backend = BACKENDS[configuration.backend]
+    output, metrics = measure(backend.run, code, *configuration.args, trace_memory=trace_memory and backend.in_process)
+    return output, SHED_STAGES.pop_report(), metrics
+
+
+def configuration_key(configuration, code):
+    """Cache key of the output of `configuration` over `code`."""
+    fingerprint = BACKENDS[configuration.backend].fingerprint()
+    return ResultCache.key(fingerprint, configuration.name, configuration.args, code)
+
+
+def add_selection_arguments(parser):
+    """Add the `--only` / `--exclude` options of `parse_selection` to an argparse parser."""
+    for option, verb in (("--only", "only run"), ("--exclude", "skip")):
+        parser.add_argument(option, metavar="PATTERNS", action="append", default=[],
+                            help=f"{verb} configurations matching these comma-separated names, "
+                                 f"backends or wildcards (repeatable)")
+
+
+def parse_selection(parser, args):
+    """The configurations selected by `--only` / `--exclude`, reporting bad patterns as usage errors."""
+    def patterns(values):
+        return [pattern for value in values for pattern in value.split(",") if pattern]
+
+    try:
+        configurations = select_configurations(patterns(args.only), patterns(args.exclude))
+    except ValueError as error:
+        parser.error(str(error))
+    if not configurations:
+        parser.error("--only/--exclude left no configuration to run")
+    return configurations
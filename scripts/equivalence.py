@@ -0,0 +1,64 @@
+"""
+Group identical tool outputs and measure how far apart the distinct ones are.
+
+Grouping hashes each output once, so it stays linear in the number of configurations.
+The similarity matrix is only computed between one representative of each group.
+"""
+
+import hashlib
+from collections import Counter
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def group_by_content(outputs, hashes=None):
+    """Group the names of identical outputs, given a `{name: output}` dict.
+
+    Returns every group, singletons included, as lists of names in first-seen order.
+    """
+    hashes = hashes or {name: content_hash(output) for name, output in outputs.items()}
+    groups = {}
+    for name in outputs:
+        groups.setdefault(hashes[name], []).append(name)
+    return list(groups.values())
+
+
+def differing_lines(first, second):
+    """Count the lines of either side that have no counterpart in the other one, given line `Counter`s.
+
+    Lines are compared as multisets, so moved lines are not counted as differences.
+    """
+    return sum(((first - second) + (second - first)).values())
+
+
+def similarity_report(outputs):
+    """Identical groups plus a pairwise `differing_lines` / `similarity` matrix, JSON-serializable."""
+    hashes = {name: content_hash(output) for name, output in outputs.items()}
+    groups = group_by_content(outputs, hashes)
+    group_of = {name: group[0] for group in groups for name in group}
+    line_totals = {name: len(output.splitlines()) for name, output in outputs.items()}
+
+    # Compute each distance once between group representatives, then spread it to every member
+    representatives = [group[0] for group in groups]
+    line_counts = {name: Counter(outputs[name].splitlines()) for name in representatives}
+    distances = {}
+    for position, first in enumerate(representatives):
+        distances[first, first] = 0
+        for second in representatives[position + 1:]:
+            distances[first, second] = distances[second, first] = differing_lines(
+                line_counts[first], line_counts[second]
+            )
+
+    matrix = {}
+    for first in outputs:
+        matrix[first] = {}
+        for second in outputs:
+            distance = distances[group_of[first], group_of[second]]
+            total = line_totals[first] + line_totals[second]
+            matrix[first][second] = {
+                "differing_lines": distance,
+                "similarity": round(1 - distance / total, 4) if total else 1.0,
+            }
+    return {"groups": groups, "hashes": hashes, "matrix": matrix}
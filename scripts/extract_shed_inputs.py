@@ -1,47 +1,125 @@
 #!/usr/bin/env python3
 """
 Extract input code from shed test files and save them to test_files directory.
-Unused now, still useful for the future.
+
+Extraction is incremental: a manifest of the recorded files' hashes is kept next to the
+inputs, so only new or changed recorded files are extracted again (e.g. after bumping the
+vendor/shed submodule), and inputs of recorded files that are gone are removed. With
+`--force`, every input not extracted again is removed, whether the manifest knew it or not.
 """
 
+import os
+import json
+import hashlib
+import argparse
 import pathlib
-import re
+from concurrent.futures import ProcessPoolExecutor
 
-def extract_inputs():
-    """Extract input code from shed recorded test files."""
-    # Source directory
-    recorded_dir = pathlib.Path("vendor/shed/tests/recorded")
+RECORDED_DIR = pathlib.Path("vendor/shed/tests/recorded")
+TARGET_DIR = pathlib.Path("test_files/shed_inputs")
+MANIFEST_NAME = ".manifest.json"
+
+# Separator used in shed test files, between the input and the expected output
+JOINER = "\n\n" + "=" * 80 + "\n\n"
+
+
+def read_input(test_file, chunk_size=1 << 16):
+    """Text of a recorded test file up to its first separator, without reading the rest of the file."""
+    buffer = ""
+    with open(test_file) as file:
+        while True:
+            chunk = file.read(chunk_size)
+            # At the end, a separator is appended so that a file without one is all input
+            buffer += chunk if chunk else JOINER
+            # Only search the new text, plus what could be the start of a separator across chunks
+            index = buffer.find(JOINER, max(0, len(buffer) - len(chunk or JOINER) - len(JOINER) + 1))
+            if index != -1:
+                return buffer[:index]
+
+
+def output_name(test_file, input_code):
+    """Inputs that look like Python get a .py extension, others keep .txt."""
+    if input_code and not input_code.startswith('#') or 'import ' in input_code or 'def ' in input_code or 'class ' in input_code:
+        return f"{test_file.stem}.py"
+    return f"{test_file.stem}.txt"
 
-    # Target directory
-    target_dir = pathlib.Path("test_files/shed_inputs")
-    target_dir.mkdir(parents=True, exist_ok=True)
 
-    # Separator used in shed test files
-    joiner = "\n\n" + "=" * 80 + "\n\n"
+def file_hash(path):
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def extract_input(test_file, target_dir, previous):
+    """Extract one recorded file unless its `previous` manifest entry shows it is unchanged.
+
+    Returns `(entry, extracted)`; top-level so that it can be sent to a worker process.
+    """
+    stat = test_file.stat()
+    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if previous and (target_dir / previous["output"]).exists():
+        # Same size and modification time: trust the recorded hash without reading the file
+        if (previous["size"], previous["mtime_ns"]) == (entry["size"], entry["mtime_ns"]):
+            return previous, False
+        entry["sha256"] = file_hash(test_file)
+        if entry["sha256"] == previous["sha256"]:
+            return {**previous, **entry}, False
+    else:
+        entry["sha256"] = file_hash(test_file)
+
+    input_code = read_input(test_file).strip()
+    entry["output"] = output_name(test_file, input_code)
+    (target_dir / entry["output"]).write_text(input_code + "\n")
+    if previous and previous["output"] != entry["output"]:
+        (target_dir / previous["output"]).unlink(missing_ok=True)
+    return entry, True
+
+
+def extract_inputs(recorded_dir=RECORDED_DIR, target_dir=TARGET_DIR, jobs=1, force=False):
+    """Extract input code from shed recorded test files."""
+    target_dir.mkdir(parents=True, exist_ok=True)
+    manifest_file = target_dir / MANIFEST_NAME
+    manifest = {} if force or not manifest_file.exists() else json.loads(manifest_file.read_text())
 
-    # Process each recorded test file
-    for test_file in recorded_dir.glob("*.txt"):
-        print(f"Processing {test_file.name}...")
+    test_files = sorted(recorded_dir.glob("*.txt"))
+    arguments = [(test_file, target_dir, manifest.get(test_file.name)) for test_file in test_files]
+    if jobs > 1 and len(arguments) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(extract_input, *zip(*arguments)))
+    else:
+        results = [extract_input(*argument) for argument in arguments]
 
-        content = test_file.read_text()
+    new_manifest = {}
+    extracted = 0
+    for test_file, (entry, changed) in zip(test_files, results):
+        new_manifest[test_file.name] = entry
+        if changed:
+            extracted += 1
+            print(f"Processing {test_file.name}...")
+            print(f"  -> {target_dir / entry['output']}")
 
-        # Split on the separator and get the input part
-        parts = (content + joiner).split(joiner)
-        if len(parts) >= 2:
-            input_code = parts[0].strip()
+    removed = 0
+    for name, entry in manifest.items():
+        if name not in new_manifest:
+            (target_dir / entry["output"]).unlink(missing_ok=True)
+            removed += 1
+            print(f"Removed {entry['output']} ({name} is gone)")
+    if force:
+        # The previous manifest was ignored, so inputs of recorded files that are gone aren't in it
+        outputs = {entry["output"] for entry in new_manifest.values()}
+        for path in sorted(target_dir.iterdir()):
+            if path.suffix in (".py", ".txt") and path.is_file() and path.name not in outputs:
+                path.unlink()
+                removed += 1
+                print(f"Removed {path.name} (no recorded file for it)")
 
-            # Create output filename - change .txt to .py for Python files
-            output_name = test_file.stem
-            if input_code and not input_code.startswith('#') or 'import ' in input_code or 'def ' in input_code or 'class ' in input_code:
-                output_file = target_dir / f"{output_name}.py"
-            else:
-                output_file = target_dir / f"{output_name}.txt"
+    manifest_file.write_text(json.dumps(new_manifest, indent=2, sort_keys=True) + "\n")
+    print(f"{extracted} extracted, {len(test_files) - extracted} unchanged, {removed} removed")
 
-            # Write the input code
-            output_file.write_text(input_code + "\n")
-            print(f"  -> {output_file}")
-        else:
-            print(f"  -> Skipped (no separator found)")
 
 if __name__ == "__main__":
-    extract_inputs()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="extract on up to JOBS worker processes (default: number of CPUs)")
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and extract every file again")
+    args = parser.parse_args()
+    extract_inputs(jobs=args.jobs, force=args.force)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Long-lived formatting daemon, keeping Black, Shed, libcst and com2ann imported and warm.
+
+Requests and responses are JSON lines, over stdin/stdout or a Unix socket:
+
+    {"id": 1, "configuration": "black_only", "input": "x=1\\n"}
+    {"id": 1, "configuration": "black_only", "output": "x = 1\\n", "error": null, "seconds": 0.0012}
+
+Configurations are the ones of configurations.py. Shed configurations also get
+their "stages" report. Send {"command": "shutdown"} to stop the daemon.
+"""
+
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import socketserver
+from pathlib import Path
+
+from configurations import CONFIGURATIONS_BY_NAME, run_configuration
+
+WARMUP_CODE = "from typing import List\n\n\ndef f(x  ):  # type: (int) -> List[int]\n    return [x]\n"
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def warm_up():
+    """Run every configuration once, so that imports and Black's grammar loading happen now."""
+    start = time.perf_counter()
+    for name in CONFIGURATIONS_BY_NAME:
+        run_configuration(name, WARMUP_CODE)
+    return time.perf_counter() - start
+
+
+def handle(request):
+    """Answer one request, never raising."""
+    response = {"id": request.get("id"), "configuration": request.get("configuration")}
+    name = request.get("configuration")
+    if not isinstance(name, str) or name not in CONFIGURATIONS_BY_NAME:
+        return {**response, "output": None, "error": f"Unknown configuration, expected one of {list(CONFIGURATIONS_BY_NAME)}"}
+    if not isinstance(request.get("input"), str):
+        return {**response, "output": None, "error": "Missing input"}
+
+    start = time.perf_counter()
+    try:
+        output, stages, _ = run_configuration(name, request["input"])
+        response.update(output=output, error=None)
+    except Exception as error:
+        stages = None
+        response.update(output=None, error=f"{type(error).__name__}: {error}")
+    response["seconds"] = time.perf_counter() - start
+    if stages:
+        response["stages"] = stages
+    return response
+
+
+def serve_lines(lines, write):
+    """Answer every JSON line of `lines` through `write`; returns True on a shutdown command."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as error:
+            write(json.dumps({"id": None, "output": None, "error": f"Invalid JSON: {error}"}) + "\n")
+            continue
+        if not isinstance(request, dict):
+            write(json.dumps({"id": None, "output": None, "error": "Invalid request, expected a JSON object"}) + "\n")
+            continue
+        if request.get("command") == "shutdown":
+            return True
+        write(json.dumps(handle(request)) + "\n")
+    return False
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        lines = (line.decode("utf-8") for line in self.rfile)
+
+        def write(text):
+            self.wfile.write(text.encode("utf-8"))
+            self.wfile.flush()
+
+        if serve_lines(lines, write):
+            # `shutdown()` waits for `serve_forever()`, which is what called us
+            threading.Thread(target=self.server.shutdown).start()
+
+
+def serve(socket_path=None):
+    log(f"🔥 Warmed up in {warm_up():.2f}s")
+    if socket_path is None:
+        log("📡 Serving JSON lines on stdin")
+
+        def write(text):
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+        serve_lines(sys.stdin, write)
+        return
+
+    socket_path = Path(socket_path)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    socket_path.unlink(missing_ok=True)
+    # Not threaded on purpose: Shed runs patch module globals, so requests are handled one at a time
+    with socketserver.UnixStreamServer(str(socket_path), RequestHandler) as server:
+        log(f"📡 Serving JSON lines on {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            socket_path.unlink(missing_ok=True)
+    log("👋 Daemon stopped")
+
+
+def send(socket_path, lines):
+    """Send JSON `lines` to a running daemon, yielding response lines as they arrive."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(socket_path))
+
+        # Write from another thread, the daemon won't read more requests while we don't read its responses
+        def write_requests():
+            for line in lines:
+                connection.sendall(line.encode("utf-8") if line.endswith("\n") else (line + "\n").encode("utf-8"))
+            connection.shutdown(socket.SHUT_WR)
+
+        writer = threading.Thread(target=write_requests, daemon=True)
+        writer.start()
+        with connection.makefile("r", encoding="utf-8") as responses:
+            yield from responses
+        writer.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="start the daemon")
+    serve_parser.add_argument("--socket", metavar="PATH", help="listen on a Unix socket instead of stdin/stdout")
+    send_parser = commands.add_parser("send", help="send JSON lines from stdin to a running daemon")
+    send_parser.add_argument("--socket", metavar="PATH", required=True, help="the daemon's Unix socket")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.socket)
+    else:
+        for response in send(args.socket, sys.stdin):
+            sys.stdout.write(response)
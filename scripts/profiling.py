@@ -0,0 +1,115 @@
+"""
+Profile tool runs with cProfile and tracemalloc, for compare_configurations.py --profile.
+
+Each profiled run gives a pstats file (for `python -m pstats`, snakeviz, ...) and a
+collapsed-stack file (`frame;frame;frame microseconds` lines, for flamegraph.pl,
+speedscope, inferno, ...).
+
+Subprocesses (Ruff, including the ones Shed starts) show up as frames named after the
+command, e.g. `subprocess ruff`, see subprocess_usage.py.
+"""
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import tracemalloc
+
+from subprocess_usage import SUBPROCESS_FRAME_PREFIX
+
+def frame_label(code):
+    """`package/module.py:Class.function`, keeping the directory so that e.g. Black's and libcst's `__init__.py` differ."""
+    filename = "/".join(code.co_filename.split(os.sep)[-2:])
+    return f"{filename}:{code.co_qualname}"
+
+
+def builtin_label(function):
+    """`module.function` for C functions, which also covers mypyc-compiled ones like Black's."""
+    name = getattr(function, "__qualname__", None) or getattr(function, "__name__", repr(function))
+    module = getattr(function, "__module__", None)
+    return f"{module}.{name}" if module and module != "builtins" else name
+
+
+def collapsed_stacks(function, args):
+    """Run `function(*args)` under a `sys.setprofile` tracer, returning `(result, {stack: self seconds})`.
+
+    Unlike stacks rebuilt from cProfile's caller -> callee edges, these are the actual call
+    stacks, so a helper shared by Black and Ruff stages isn't credited with both.
+    Subprocess frames are leaves holding their whole time.
+    """
+    stacks = {}
+    paths = [""]
+    collapsed_depth = 0  # Calls inside a subprocess frame, charged to it
+    last = [time.perf_counter()]
+
+    def profiler(frame, event, arg):
+        nonlocal collapsed_depth
+        if len(paths) > 1:
+            stacks[paths[-1]] = stacks.get(paths[-1], 0.0) + time.perf_counter() - last[0]
+        if event in ("call", "c_call"):
+            if collapsed_depth:
+                collapsed_depth += 1
+            else:
+                label = frame_label(frame.f_code) if event == "call" else builtin_label(arg)
+                paths.append(f"{paths[-1]};{label}" if paths[-1] else label)
+                collapsed_depth = int(event == "call" and frame.f_code.co_name.startswith(SUBPROCESS_FRAME_PREFIX))
+        elif len(paths) > 1:  # Returns, ignoring the ones from above `function`
+            if collapsed_depth > 1:
+                collapsed_depth -= 1
+            else:
+                collapsed_depth = 0
+                paths.pop()
+        last[0] = time.perf_counter()
+
+    sys.setprofile(profiler)
+    try:
+        result = function(*args)
+    finally:
+        sys.setprofile(None)
+    return result, stacks
+
+
+def profile_run(function, args, stem, reset=None):
+    """Profile `function(*args)`, writing `<stem>.pstats` and `<stem>.collapsed`.
+
+    After an unprofiled warmup run, the pstats come from a run under cProfile and tracemalloc,
+    the collapsed stacks from another run under `collapsed_stacks`, `reset()` being called
+    before each profiled run so that they don't hit caches filled by the previous one.
+
+    Returns `(result, summary)`, the summary holding the profiled time, the traced memory
+    peak and the time spent in subprocesses. Profilers slow runs down, so these times are
+    only comparable with each other.
+    """
+    stem.parent.mkdir(parents=True, exist_ok=True)
+    # An unprofiled run first, so that imports and lazy initializations don't show up
+    function(*args)
+    if reset:
+        reset()
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    try:
+        result = profiler.runcall(function, *args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    profiler.dump_stats(f"{stem}.pstats")
+
+    if reset:
+        reset()
+    _, stacks = collapsed_stacks(function, args)
+    with open(f"{stem}.collapsed", "w", encoding="utf-8") as collapsed:
+        for stack, seconds in sorted(stacks.items()):
+            if round(seconds * 1_000_000):
+                collapsed.write(f"{stack} {round(seconds * 1_000_000)}\n")
+
+    stats = pstats.Stats(profiler)
+    subprocess_seconds = sum(
+        cumulative for (_, _, name), (_, _, _, cumulative, _) in stats.stats.items()
+        if name.startswith(SUBPROCESS_FRAME_PREFIX)
+    )
+    return result, {
+        "seconds": stats.total_tt,
+        "subprocess_seconds": subprocess_seconds,
+        "traced_peak_bytes": peak,
+    }
@@ -0,0 +1,79 @@
+"""
+Content-addressed on-disk cache for tool outputs, used by compare_configurations.py.
+
+Entries are keyed by a hash of the tool fingerprint, the configuration and the input,
+so any change to one of them is a miss. Least recently used entries are evicted once
+the cache grows over its size limit.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / ".cache" / "references"
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+
+class ResultCache:
+    """Store outputs as `<directory>/<key[:2]>/<key>` files, their mtime tracking last use."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_size=DEFAULT_MAX_SIZE):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @staticmethod
+    def key(fingerprint, configuration, args, code):
+        """Hash everything an output depends on."""
+        payload = json.dumps([fingerprint, configuration, repr(args), code]).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _path(self, key):
+        return self.directory / key[:2] / key
+
+    def get(self, key):
+        """Return the cached output for `key`, or `None` on a miss."""
+        path = self._path(key)
+        try:
+            output = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        os.utime(path)  # Mark as recently used
+        self.hits += 1
+        return output
+
+    def put(self, key, output):
+        """Store `output` under `key`, atomically so that concurrent runs never see partial entries."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(output)
+        os.replace(temporary, path)
+
+    def prune(self):
+        """Evict least recently used entries until the cache fits in `max_size` bytes."""
+        if not self.directory.exists():
+            return
+        entries = []
+        for path in self.directory.glob("??/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # Evicted by a concurrent run
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evicted += 1
+
+    def summary(self):
+        return f"{self.hits} hits, {self.misses} misses, {self.evicted} evicted"
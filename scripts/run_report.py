@@ -0,0 +1,139 @@
+"""
+Measure tool runs and append them to a JSONL run report, one record per configuration and input.
+
+Records of many runs can go to the same file: each record has the run id and timestamp,
+so that runs can be aggregated over time without scraping the emoji output.
+
+Configurations run in batches (Ruff over many corpus files at once) aren't timed per file:
+their records have null metrics, and the metrics of the whole batch under `batch`, including
+its number of `files`. Hashes are `equivalence.content_hash`, the ones outputs are grouped by.
+"""
+
+import json
+import time
+import uuid
+import resource
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from equivalence import content_hash
+from subprocess_usage import MAXRSS_UNIT, collect_usage
+
+
+def measure(function, *args, trace_memory=False):
+    """Run `function(*args)`, returning `(result, metrics)`.
+
+    CPU time counts this process and the subprocesses that finished during the call (Ruff).
+    `peak_rss_bytes` is the high-water mark of this process or of any of its subprocesses so far,
+    not of this call alone. The subprocess metrics are the ones of each child (`subprocess_usage`),
+    `subprocess_peak_rss_bytes` being `None` when no child's peak could be told apart from the
+    wrapper's footprint. With `trace_memory`, `traced_peak_bytes` is the tracemalloc peak of
+    the Python allocations of the call, which makes it slower.
+    """
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    elif trace_memory:
+        tracemalloc.reset_peak()
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    try:
+        with collect_usage() as usages:
+            result = function(*args)
+        wall = time.perf_counter() - start
+        traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if tracing:
+            tracemalloc.stop()
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # RUSAGE_CHILDREN includes the children of `subprocess_usage.run`, reaped by its wrappers
+    subprocess_cpu = sum(usage["cpu_seconds"] for usage in usages)
+    cpu = sum(
+        (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+        for before, after in ((self_before, self_after), (children_before, children_after))
+    )
+    subprocess_peak = max((usage["peak_rss_bytes"] for usage in usages if usage["peak_rss_bytes"]), default=None)
+    metrics = {
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "peak_rss_bytes": max(self_after.ru_maxrss * MAXRSS_UNIT, children_after.ru_maxrss * MAXRSS_UNIT,
+                              subprocess_peak or 0),
+        "subprocesses": len(usages),
+        "subprocess_cpu_seconds": subprocess_cpu,
+        "subprocess_peak_rss_bytes": subprocess_peak,
+    }
+    if trace_memory:
+        metrics["traced_peak_bytes"] = traced_peak
+    return result, metrics
+
+
+def format_metrics(metrics):
+    """One line summary of `measure` metrics, e.g. `74.2ms CPU, traced peak 6.6MB, 1 subprocess(es) peaking at ...`."""
+    parts = [f"{metrics['cpu_seconds'] * 1000:.1f}ms CPU"]
+    if metrics.get("traced_peak_bytes") is not None:
+        parts.append(f"traced peak {metrics['traced_peak_bytes'] / 2**20:.1f}MB")
+    if metrics.get("subprocesses"):
+        peak = metrics["subprocess_peak_rss_bytes"]
+        peaking = f" peaking at {peak / 2**20:.1f}MB RSS" if peak is not None else ""
+        parts.append(f"{metrics['subprocesses']} subprocess(es){peaking}"
+                     f" ({metrics['subprocess_cpu_seconds'] * 1000:.1f}ms CPU)")
+    return ", ".join(parts)
+
+
+class RunReport:
+    """Append-only JSONL report of one run (`mode` being e.g. "generate", "verify" or "benchmark")."""
+
+    def __init__(self, path, mode):
+        self.path = Path(path)
+        self.mode = mode
+        self.run = uuid.uuid4().hex
+        self.records = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = self.path.open("a", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def record(self, input_name, code, configuration, versions, output, error=None, metrics=None, **fields):
+        """Write the record of one configuration over one input.
+
+        `metrics` are the `measure` ones, `None` when the output came from the cache, or
+        `{"batch": metrics}` for a batched configuration, leaving the per-file metrics null.
+        """
+        record = {
+            "run": self.run,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "mode": self.mode,
+            "input": str(input_name),
+            "input_sha256": content_hash(code),
+            "configuration": configuration.name,
+            "backend": configuration.backend,
+            "versions": versions,
+            "output_sha256": None if output is None else content_hash(output),
+            "output_chars": None if output is None else len(output),
+            "output_bytes": None if output is None else len(output.encode("utf-8")),
+            "error": error,
+            "cached": metrics is None and error is None,
+            "wall_seconds": None,
+            "cpu_seconds": None,
+            "peak_rss_bytes": None,
+            "subprocesses": None,
+            "subprocess_cpu_seconds": None,
+            "subprocess_peak_rss_bytes": None,
+            "traced_peak_bytes": None,
+            "batch": None,
+            **(metrics or {}),
+            **fields,
+        }
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        self.records += 1
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Run tool configurations over a ladder of synthetic input sizes and fit their scaling curves.
+
+Each configuration's time is fitted as `overhead + k * lines^exponent`, the fixed overhead
+(process startup, imports already done, ...) being measured on a one-line input, and the
+exponent being the slope of the remaining time against the size on a log-log scale.
+Configurations whose exponent is above the threshold are flagged as superlinear.
+"""
+
+import sys
+import json
+import math
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+from configurations import BACKENDS, add_selection_arguments, clear_tool_caches, parse_selection
+from synthetic_inputs import Template, TEST_FILE, generate
+
+DEFAULT_SIZES = [250, 1000, 4000, 16000]
+DEFAULT_THRESHOLD = 1.2
+# Sizes above one taking longer than this are skipped for the configuration
+DEFAULT_BUDGET = 60.0
+OVERHEAD_INPUT = "pass\n"
+
+
+def median_time(configuration, code, repeat):
+    run = BACKENDS[configuration.backend].run
+    timings = []
+    for _ in range(repeat):
+        clear_tool_caches()
+        start = time.perf_counter()
+        run(code, *configuration.args)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def fit_exponent(sizes, seconds, overhead):
+    """Least squares slope of `log(seconds - overhead)` against `log(sizes)`, `None` without 2 usable points."""
+    points = [(math.log(size), math.log(value - overhead)) for size, value in zip(sizes, seconds) if value > overhead]
+    if len(points) < 2:
+        return None
+    mean_x = statistics.fmean(x for x, _ in points)
+    mean_y = statistics.fmean(y for _, y in points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def main(configurations, sizes=DEFAULT_SIZES, seed=0, repeat=3, budget=DEFAULT_BUDGET,
+         threshold=DEFAULT_THRESHOLD, json_path=None, strict=False):
+    template = Template(TEST_FILE.read_text())
+    inputs = {size: generate(size, seed, template) for size in sizes}
+    print(f"📏 Size ladder: {', '.join(f'{size} lines' for size in sizes)} (seed {seed}, {repeat} run(s) each)")
+    print()
+
+    report = {}
+    for configuration in configurations:
+        name = configuration.name
+        print(f"⏱️ {name}")
+        result = report[name] = {"sizes": [], "seconds": [], "error": None, "over_budget_at": None}
+        try:
+            # A first run imports the tool and warms it up, so that it isn't counted as overhead
+            median_time(configuration, OVERHEAD_INPUT, 1)
+            result["overhead_seconds"] = median_time(configuration, OVERHEAD_INPUT, repeat)
+            for size in sizes:
+                seconds = median_time(configuration, inputs[size], repeat)
+                result["sizes"].append(size)
+                result["seconds"].append(seconds)
+                print(f"   {size:>7} lines: {seconds * 1000:10.1f}ms")
+                if seconds > budget and size != sizes[-1]:
+                    result["over_budget_at"] = size
+                    print(f"   ⏭️ Over the {budget:g}s budget, skipping larger sizes")
+                    break
+        except Exception as error:
+            result["error"] = f"{type(error).__name__}: {error}"
+            print(f"   ❌ {result['error']}")
+        result["exponent"] = fit_exponent(result["sizes"], result["seconds"], result.get("overhead_seconds", 0.0))
+        result["superlinear"] = result["exponent"] is not None and result["exponent"] > threshold
+
+    print()
+    print(f"📈 Scaling exponents (time ~ lines^exponent, superlinear above {threshold:g}):")
+    flagged = []
+    for name, result in report.items():
+        if result["exponent"] is None:
+            print(f"   ❔ {name:<28} not enough measurements")
+            continue
+        status = "⚠️" if result["superlinear"] else "✅"
+        overhead = f"{result['overhead_seconds'] * 1000:.1f}ms overhead"
+        print(f"   {status} {name:<28} lines^{result['exponent']:.2f} ({overhead})")
+        if result["superlinear"]:
+            flagged.append(name)
+
+    if json_path:
+        Path(json_path).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"📐 Measurements and fits written to {json_path}")
+    print()
+    if flagged:
+        print(f"⚠️ Superlinear: {', '.join(flagged)}")
+        if strict:
+            sys.exit(1)
+    else:
+        print("✅ Every configuration scales linearly (or better)!")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda value: sorted({int(size) for size in value.split(",")}),
+                        default=DEFAULT_SIZES,
+                        help=f"comma-separated line counts (default: {','.join(map(str, DEFAULT_SIZES))})")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic inputs (default: 0)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size, the median is kept (default: 3)")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help=f"seconds above which larger sizes are skipped (default: {DEFAULT_BUDGET:g})")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"exponent above which a configuration is flagged (default: {DEFAULT_THRESHOLD:g})")
+    parser.add_argument("--json", metavar="PATH", help="write the measurements and fits as JSON")
+    parser.add_argument("--strict", action="store_true", help="exit with an error when a configuration is flagged")
+    add_selection_arguments(parser)
+    args = parser.parse_args()
+    configurations = parse_selection(parser, args)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if len(args.sizes) < 2:
+        parser.error("--sizes needs at least two sizes to fit a curve")
+    main(configurations, args.sizes, seed=args.seed, repeat=args.repeat, budget=args.budget,
+         threshold=args.threshold, json_path=args.json, strict=args.strict)
@@ -0,0 +1,107 @@
+"""
+Memoize and time the stages of Shed runs, used by compare_configurations.py.
+
+Shed calls `black.format_str` and `subprocess.run(["ruff", ...])` through its module
+globals, so swapping those for instrumented proxies during a call lets a stage that
+already ran on the same input (e.g. when `refactor=True` codemods changed nothing) be
+reused, and tells how each run splits between Black, Ruff and Shed itself (parsing,
+com2ann and the libcst codemods). Ruff runs through `subprocess_usage.run`, which records
+the usage of each child.
+"""
+
+import time
+import hashlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import subprocess_usage
+
+STAGES = ("black", "ruff", "shed")
+
+
+class _Proxy:
+    """Delegate every attribute to `module`, except the overridden ones."""
+
+    def __init__(self, module, **overrides):
+        self._module = module
+        self.__dict__.update(overrides)
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+
+class ShedStages:
+    """Per-process memo of Shed stage results, with the stage report of the last run."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.memo = OrderedDict()
+        self.report = None
+
+    def clear(self):
+        self.memo.clear()
+
+    def _stage(self, stage, key, compute):
+        if key in self.memo:
+            self.memo.move_to_end(key)
+            self.report["reused"] += 1
+            return self.memo[key]
+        start = time.perf_counter()
+        result = compute()
+        self.report[stage] += time.perf_counter() - start
+        self.memo[key] = result
+        if len(self.memo) > self.max_entries:
+            self.memo.popitem(last=False)
+        return result
+
+    @contextmanager
+    def _instrumented(self, shed_module):
+        black_module, subprocess_module = shed_module.black, shed_module.subprocess
+
+        def format_str(src, *, mode):
+            key = ("black", hashlib.sha256(src.encode("utf-8")).hexdigest(), mode)
+            return self._stage("black", key, lambda: black_module.format_str(src, mode=mode))
+
+        def run(args, **kwargs):
+            if not args or args[0] != "ruff":
+                return subprocess_module.run(args, **kwargs)
+            code = kwargs.get("input") or ""
+            key = ("ruff", tuple(args), hashlib.sha256(code.encode("utf-8")).hexdigest())
+            return self._stage("ruff", key, lambda: subprocess_usage.run(args, **kwargs))
+
+        shed_module.black = _Proxy(black_module, format_str=format_str)
+        shed_module.subprocess = _Proxy(subprocess_module, run=run)
+        try:
+            yield
+        finally:
+            shed_module.black, shed_module.subprocess = black_module, subprocess_module
+
+    def shed(self, shed_module, code, **kwargs):
+        """Run `shed_module.shed(code, **kwargs)` with memoized stages, recording `self.report`."""
+        self.report = {"black": 0.0, "ruff": 0.0, "reused": 0}
+        start = time.perf_counter()
+        try:
+            with self._instrumented(shed_module):
+                output = shed_module.shed(code, **kwargs)
+        except BaseException:
+            self.report = None
+            raise
+        total = time.perf_counter() - start
+        self.report["shed"] = max(0.0, total - self.report["black"] - self.report["ruff"])
+        self.report["total"] = total
+        self.report["dominant"] = max(STAGES, key=self.report.get)
+        return output
+
+    def pop_report(self):
+        """Return the report of the last run, once."""
+        report, self.report = self.report, None
+        return report
+
+
+def format_stage_report(report):
+    """One line summary of a stage report, e.g. `ruff 52% (20.1ms), black 40% (...), ...`."""
+    total = report["total"] or 1
+    stages = sorted(STAGES, key=report.get, reverse=True)
+    summary = ", ".join(f"{stage} {report[stage] / total:.0%} ({report[stage] * 1000:.1f}ms)" for stage in stages)
+    reused = f", {report['reused']} stage(s) reused" if report["reused"] else ""
+    return f"dominated by {report['dominant']}: {summary}{reused}"
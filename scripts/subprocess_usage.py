@@ -0,0 +1,140 @@
+"""
+Run tool subprocesses (Ruff), recording the CPU time and peak RSS of each child.
+
+`subprocess.run` reaps children with `os.waitpid`, which discards their resource usage,
+and a child's `ru_maxrss` starts from the RSS of the process that forked it, since Linux
+carries the high-water mark across fork and exec: a child of this (possibly large) process
+would report this process's memory as its own peak. So `run` starts each child from a small
+`python -c` wrapper instead, which reaps it with `os.wait4` and writes its usage to a pipe.
+A peak that doesn't exceed the wrapper's own footprint is only an upper bound, and reported
+as `None`. Usages go to the innermost `collect_usage()` block, if any.
+
+Measuring needs `os.wait4` and `os.posix_spawnp`, i.e. a POSIX system: elsewhere, and for
+`subprocess.run` arguments the wrapper doesn't handle, `run` is `subprocess.run`, unmeasured.
+
+Children also run through a frame named after the command, e.g. `subprocess ruff`, so
+that profiles show their time on its own instead of inside `subprocess` internals.
+"""
+
+import os
+import sys
+import json
+import signal
+import subprocess
+from contextlib import contextmanager
+from functools import lru_cache
+
+SUBPROCESS_FRAME_PREFIX = "subprocess "
+# `ru_maxrss` is in kilobytes on Linux, in bytes on macOS
+MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+MEASURABLE = hasattr(os, "wait4") and hasattr(os, "posix_spawnp")
+# `run` arguments the wrapper handles, any other one runs through `subprocess.run` unmeasured
+WRAPPER_ARGUMENTS = {"stdin", "stdout", "stderr", "cwd", "env", "text", "encoding", "errors", "universal_newlines"}
+
+# Run as `python -S -E -c WRAPPER <usage fd> <args>...`: spawns `args` with the wrapper's standard
+# streams, working directory and environment, and writes its wait status and usage to the usage fd
+# as JSON. `floor_bytes` is the most the child can inherit from the wrapper's own memory.
+WRAPPER = """
+import os, sys, json, resource
+
+def floor_bytes():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+usage_fd = int(sys.argv[1])
+os.set_inheritable(usage_fd, False)
+try:
+    pid = os.posix_spawnp(sys.argv[2], sys.argv[2:], os.environ)
+except OSError as error:
+    usage = {"errno": error.errno, "strerror": error.strerror, "filename": sys.argv[2]}
+else:
+    _, status, rusage = os.wait4(pid, 0)
+    usage = {"returncode": os.waitstatus_to_exitcode(status), "cpu_seconds": rusage.ru_utime + rusage.ru_stime,
+             "maxrss": rusage.ru_maxrss, "floor_bytes": floor_bytes()}
+os.write(usage_fd, json.dumps(usage).encode())
+"""
+
+_collectors = []
+
+
+@lru_cache(maxsize=None)
+def subprocess_frame(executable):
+    """A function only calling through, whose frame is named after `executable`."""
+    def frame(function, *args):
+        return function(*args)
+
+    name = f"{SUBPROCESS_FRAME_PREFIX}{executable}"
+    frame.__code__ = frame.__code__.replace(co_name=name, co_qualname=name)
+    return frame
+
+
+def _communicate(args, input, timeout, kwargs):
+    """Run `args` through the wrapper, returning `(usage, stdout, stderr)`."""
+    usage_read, usage_write = os.pipe()
+    try:
+        # In its own process group, so that the child is killed along with the wrapper
+        process = subprocess.Popen([sys.executable, "-S", "-E", "-c", WRAPPER, str(usage_write),
+                                    *map(os.fsdecode, args)],
+                                   pass_fds=(usage_write,), start_new_session=True, **kwargs)
+    except BaseException:
+        os.close(usage_read)
+        raise
+    finally:
+        os.close(usage_write)
+    with process, open(usage_read, "rb") as usage_file:
+        try:
+            stdout, stderr = process.communicate(input, timeout=timeout)
+        except subprocess.TimeoutExpired as error:
+            os.killpg(process.pid, signal.SIGKILL)
+            error.output, error.stderr = process.communicate()
+            raise
+        except BaseException:
+            os.killpg(process.pid, signal.SIGKILL)
+            raise
+        usage = usage_file.read()
+    if not usage:
+        raise OSError(f"subprocess wrapper exited with {process.returncode}")
+    return json.loads(usage), stdout, stderr
+
+
+def run(args, *, input=None, capture_output=False, timeout=None, check=False, **kwargs):
+    """`subprocess.run`, recording the child's usage."""
+    if not MEASURABLE or set(kwargs) - WRAPPER_ARGUMENTS:
+        return subprocess.run(args, input=input, capture_output=capture_output, timeout=timeout, check=check,
+                              **kwargs)
+    if input is not None:
+        kwargs["stdin"] = subprocess.PIPE
+    if capture_output:
+        kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+    executable = os.path.basename(args[0])
+    usage, stdout, stderr = subprocess_frame(executable)(_communicate, args, input, timeout, kwargs)
+    if "errno" in usage:
+        raise OSError(usage["errno"], usage["strerror"], usage["filename"])
+    if _collectors:
+        peak = usage["maxrss"] * MAXRSS_UNIT
+        _collectors[-1].append({
+            "command": executable,
+            "cpu_seconds": usage["cpu_seconds"],
+            "peak_rss_bytes": peak if peak > usage["floor_bytes"] else None,
+        })
+    returncode = usage["returncode"]
+    if check and returncode:
+        raise subprocess.CalledProcessError(returncode, args, stdout, stderr)
+    return subprocess.CompletedProcess(args, returncode, stdout, stderr)
+
+
+@contextmanager
+def collect_usage():
+    """Collect the usage of every child `run` in the block, as a list of dicts."""
+    usages = []
+    _collectors.append(usages)
+    try:
+        yield usages
+    finally:
+        _collectors.remove(usages)
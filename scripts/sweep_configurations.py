@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Sweep option grids of every tool and collapse the configurations giving identical outputs.
+
+A configuration is a pipeline of stages, e.g. Black with some options feeding Ruff with
+some rules. Stage results are memoized on the stage and the hash of its input, so a
+Black pass shared by many pipelines (or giving the same output under different options)
+only feeds each downstream stage once.
+"""
+
+import json
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import product
+from pathlib import Path
+
+from configurations import BACKENDS
+from equivalence import content_hash, group_by_content, similarity_report
+from result_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_SIZE, ResultCache
+
+TEST_FILE = Path(__file__).parent.parent / "test_files" / "broken_python.py"
+
+# The option grids to sweep
+BLACK_LINE_LENGTHS = [79, 88, 100, 120]
+BLACK_STRING_NORMALIZATION = [True, False]
+RUFF_SELECTS = ["E,W,F841", "F401,F841,I", "I", "UP", "E,W,F401,F841,I,UP"]
+SHED_REFACTOR = [False, True]
+
+
+def stage(backend, **options):
+    """A pipeline stage: the `backend` run with `options`, hashable so that it can key the memo."""
+    return (backend, tuple(sorted(options.items())))
+
+
+def stage_label(pipeline_stage):
+    name, options = pipeline_stage
+    return f"{name}({', '.join(f'{key}={value!r}' for key, value in options)})" if options else name
+
+
+def pipeline_label(pipeline):
+    return " -> ".join(stage_label(pipeline_stage) for pipeline_stage in pipeline)
+
+
+def build_pipelines():
+    """Every pipeline of the sweep."""
+    black_stages = [
+        stage("black", line_length=line_length, string_normalization=string_normalization)
+        for line_length, string_normalization in product(BLACK_LINE_LENGTHS, BLACK_STRING_NORMALIZATION)
+    ]
+    formatter_stages = black_stages + [stage("ruff_format")]
+    ruff_stages = [stage("ruff_fix", select=select) for select in RUFF_SELECTS]
+    shed_stages = [stage("shed", refactor=refactor) for refactor in SHED_REFACTOR]
+    return (
+        [(formatter,) for formatter in formatter_stages]
+        + [(ruff,) for ruff in ruff_stages]
+        + [(formatter, ruff) for formatter, ruff in product(formatter_stages, ruff_stages)]
+        + [(shed,) for shed in shed_stages]
+    )
+
+
+def run_stage(backend, options, code):
+    """Run one stage, returning `(output, error)`; top-level so that it can be sent to a worker process."""
+    try:
+        return BACKENDS[backend].run(code, **dict(options)), None
+    except Exception as error:
+        return None, f"{type(error).__name__}: {error}"
+
+
+class Sweep:
+    """Run pipelines over inputs, remembering every stage result by `(stage, input hash)`."""
+
+    def __init__(self, executor=None, cache=None):
+        self.executor = executor
+        self.cache = cache
+        self.contents = {}  # Content hash -> text, for every input and intermediate output
+        self.memo = {}  # (stage, input hash) -> (output hash, error)
+        self.stats = Counter()
+
+    def _run(self, tasks):
+        """Fill the memo for `(stage, input hash)` tasks that are not in it yet."""
+        todo = []
+        for task in tasks:
+            if task in self.memo:
+                self.stats["reused"] += 1
+                continue
+            (backend, options), input_hash = task
+            if self.cache:
+                key = ResultCache.key(BACKENDS[backend].fingerprint(), backend, options, self.contents[input_hash])
+                output = self.cache.get(key)
+                if output is not None:
+                    self.stats["cached"] += 1
+                    self._remember(task, output, None)
+                    continue
+            todo.append(task)
+
+        self.stats["executed"] += len(todo)
+        arguments = [(backend, options, self.contents[input_hash]) for (backend, options), input_hash in todo]
+        if self.executor is None:
+            results = [run_stage(*argument) for argument in arguments]
+        else:
+            results = self.executor.map(run_stage, *zip(*arguments)) if arguments else []
+        for task, (output, error) in zip(todo, results):
+            self._remember(task, output, error)
+            if self.cache and output is not None:
+                (backend, options), input_hash = task
+                key = ResultCache.key(BACKENDS[backend].fingerprint(), backend, options, self.contents[input_hash])
+                self.cache.put(key, output)
+
+    def _remember(self, task, output, error):
+        output_hash = None
+        if output is not None:
+            output_hash = content_hash(output)
+            self.contents.setdefault(output_hash, output)
+        self.memo[task] = (output_hash, error)
+
+    def run(self, code, pipelines):
+        """Return `{pipeline: (output, error)}`, running pipelines stage by stage in lockstep."""
+        input_hash = content_hash(code)
+        self.contents[input_hash] = code
+        current = {pipeline: (input_hash, None) for pipeline in pipelines}
+        for depth in range(max(len(pipeline) for pipeline in pipelines)):
+            active = [pipeline for pipeline in pipelines if len(pipeline) > depth and current[pipeline][0]]
+            # Keep the first-seen order so that runs are reproducible
+            tasks = list(dict.fromkeys((pipeline[depth], current[pipeline][0]) for pipeline in active))
+            self.stats["requested"] += len(active)
+            self.stats["reused"] += len(active) - len(tasks)
+            self._run(tasks)
+            for pipeline in active:
+                current[pipeline] = self.memo[pipeline[depth], current[pipeline][0]]
+        return {
+            pipeline: (self.contents[output_hash] if output_hash else None, error)
+            for pipeline, (output_hash, error) in current.items()
+        }
+
+
+def main(inputs, jobs=1, cache=None, json_path=None):
+    pipelines = build_pipelines()
+    report = {}
+    with (ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else nullcontext()) as executor:
+        sweep = Sweep(executor=executor, cache=cache)
+        for path in inputs:
+            code = path.read_text()
+            print(f"🧭 Sweeping {len(pipelines)} configurations over {path.name} ({len(code)} chars)")
+            results = sweep.run(code, pipelines)
+
+            outputs = {pipeline_label(pipeline): output for pipeline, (output, _) in results.items() if output is not None}
+            failed = {pipeline_label(pipeline): error for pipeline, (_, error) in results.items() if error is not None}
+            groups = sorted(group_by_content(outputs), key=len, reverse=True)
+            print(f"🧩 {len(groups)} distinct output(s):")
+            for group in groups:
+                print(f"   • [{len(group)}] {' == '.join(group)}")
+            for label, error in failed.items():
+                print(f"   ❌ {label}: {error}")
+            print()
+
+            report[str(path)] = {**similarity_report(outputs), "failed": failed}
+
+    stats = sweep.stats
+    print(f"⚙️ Stage runs: {stats['requested']} requested, {stats['executed']} executed,"
+          f" {stats['reused']} reused, {stats['cached']} from cache")
+    if cache:
+        cache.prune()
+        print(f"🗃️ Cache: {cache.summary()}")
+    if json_path:
+        Path(json_path).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"📐 Groups and similarity matrices written to {json_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", type=Path, default=[TEST_FILE],
+                        help="files to sweep over (default: test_files/broken_python.py)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="run stages on up to JOBS worker processes (default: 1, sequential)")
+    parser.add_argument("--json", metavar="PATH", help="write groups and similarity matrices as JSON")
+    parser.add_argument("--cache-dir", metavar="DIR", default=str(DEFAULT_CACHE_DIR),
+                        help="where stage outputs are cached (default: .cache/references)")
+    parser.add_argument("--cache-max-size", metavar="MB", type=int, default=DEFAULT_MAX_SIZE // (1024 * 1024),
+                        help=f"evict least recently used outputs above this size "
+                             f"(default: {DEFAULT_MAX_SIZE // (1024 * 1024)})")
+    parser.add_argument("--no-cache", action="store_true", help="always run every stage")
+    args = parser.parse_args()
+    cache = None if args.no_cache else ResultCache(args.cache_dir, args.cache_max_size * 1024 * 1024)
+    main(args.inputs, jobs=args.jobs, cache=cache, json_path=args.json)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Generate inputs of any size by replicating and mutating the constructs of broken_python.py.
+
+The template's imports are kept once, then its other top-level statements (with their
+comments) are replicated until the requested line count is reached. Each replica renames
+the names bound at the top level (`BadClass` -> `BadClass_r12`, everywhere in the replica),
+changes number literals, and leaves some statements out, so that replicas differ while
+keeping all the formatting issues of the template.
+"""
+
+import io
+import ast
+import random
+import argparse
+import tokenize
+import warnings
+from pathlib import Path
+
+TEST_FILE = Path(__file__).parent.parent / "test_files" / "broken_python.py"
+KEEP_PROBABILITY = 0.9
+NUMBER_MUTATION_PROBABILITY = 0.5
+
+
+def bound_names(statement):
+    """Names a top-level statement binds: function, class and assignment target names."""
+    if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return {statement.name}
+    if isinstance(statement, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+        targets = statement.targets if isinstance(statement, ast.Assign) else [statement.target]
+        return {node.id for target in targets for node in ast.walk(target) if isinstance(node, ast.Name)}
+    return set()
+
+
+class Template:
+    """A template split into its header (leading imports) and blocks of tokenized pieces."""
+
+    def __init__(self, code):
+        self.code = code
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", SyntaxWarning)  # e.g. `x*2for x in ...`
+            statements = ast.parse(code).body
+        line_offsets = [0]
+        for line in code.splitlines(keepends=True):
+            line_offsets.append(line_offsets[-1] + len(line))
+
+        header_end = 0
+        while header_end < len(statements) and isinstance(statements[header_end], (ast.Import, ast.ImportFrom)):
+            header_end += 1
+        body = statements[header_end:]
+        self.renamed = set().union(*(bound_names(statement) for statement in body))
+
+        # A block starts after the previous statement, so that it takes its comments along
+        starts = [line_offsets[statements[header_end - 1].end_lineno] if header_end else 0]
+        starts += [line_offsets[statement.end_lineno] for statement in body[:-1]]
+        self.header = code[:starts[0]]
+        ends = starts[1:] + [len(code)]
+        tokens = [
+            token for token in tokenize.generate_tokens(io.StringIO(code).readline)
+            if token.type == tokenize.NUMBER or (token.type == tokenize.NAME and token.string in self.renamed)
+        ]
+        self.blocks = []
+        for start, end in zip(starts, ends):
+            # Pieces alternate between text to copy and (token type, token string) to mutate
+            pieces, position = [], start
+            for token in tokens:
+                token_start = line_offsets[token.start[0] - 1] + token.start[1]
+                token_end = line_offsets[token.end[0] - 1] + token.end[1]
+                if start <= token_start and token_end <= end:
+                    pieces += [code[position:token_start], (token.type, token.string)]
+                    position = token_end
+            pieces.append(code[position:end])
+            self.blocks.append((pieces, code[start:end].count("\n")))
+
+
+def mutate_number(text, rng):
+    if not text.isdigit():  # Floats, hex, complex... are kept as they are
+        return text
+    if rng.random() >= NUMBER_MUTATION_PROBABILITY:
+        return text
+    return str(rng.randrange(10 ** len(text)))
+
+
+def generate(lines, seed=0, template=TEST_FILE):
+    """Build an input of about `lines` lines, the same for the same `seed`."""
+    template = template if isinstance(template, Template) else Template(Path(template).read_text())
+    rng = random.Random(seed)
+    parts = [template.header]
+    count = template.header.count("\n")
+    replica = 0
+    while count < lines:
+        replica += 1
+        for pieces, block_lines in template.blocks:
+            if count >= lines:
+                break
+            if rng.random() >= KEEP_PROBABILITY:
+                continue
+            for piece in pieces:
+                if isinstance(piece, str):
+                    parts.append(piece)
+                elif piece[0] == tokenize.NUMBER:
+                    parts.append(mutate_number(piece[1], rng))
+                else:
+                    parts.append(f"{piece[1]}_r{replica}")
+            if not parts[-1].endswith("\n"):
+                parts.append("\n")
+            count += block_lines + (0 if pieces[-1].endswith("\n") else 1)
+    return "".join(parts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=50_000, help="approximate line count (default: 50000)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("-o", "--output", metavar="PATH", type=Path, help="write there instead of stdout")
+    args = parser.parse_args()
+    code = generate(args.lines, args.seed)
+    if args.output:
+        args.output.write_text(code)
+        print(f"📝 Wrote {code.count(chr(10))} lines to {args.output}")
+    else:
+        print(code, end="")
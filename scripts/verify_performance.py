@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Fail when a tool configuration got slower than its stored baseline on the reference inputs.
+
+Timings are made noise-resistant for shared runners:
+- configurations are measured in interleaved rounds, so that a slow period of the machine
+  hits every configuration instead of one,
+- the median of the rounds is compared, not the mean or a single run,
+- medians are normalized by calibration workloads measured in the same rounds: a fixed
+  CPU-bound one for in-process tools, and spawning `ruff --version` for the subprocess ones,
+  so that a baseline recorded on one machine is usable on another,
+- slowdowns within the noise of the baseline and of the new rounds are ignored,
+- a configuration over the threshold is measured again before being reported as regressed.
+
+The baseline must come from the machine and tool versions it is checked against, which CI
+records with its "Record performance baseline" workflow: checking it against another Python
+or other tool versions is an error. Until its artifact is committed, CI skips the check
+(`--skip-without-baseline`).
+"""
+
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+import platform
+import statistics
+from pathlib import Path
+
+from configurations import BACKENDS, add_selection_arguments, clear_tool_caches, parse_selection
+
+REFERENCE_INPUTS = [Path(__file__).parent.parent / "test_files" / "broken_python.py"]
+BASELINE = Path(__file__).parent.parent / "test_files" / "performance_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_REPEAT = 11
+# Differences below this are noise whatever the ratio, e.g. for the fast Ruff configurations
+DEFAULT_MIN_DELTA = 0.005
+# Differences below this many times the summed MADs of the baseline and the new rounds are noise
+NOISE_MADS = 3
+
+
+def calibration(_code):
+    """Fixed CPU-bound work, timed alongside the tools to cancel out the machine's speed."""
+    digest = b""
+    for _ in range(200):
+        digest = hashlib.sha256(b"linter-explorer" * 256 + digest).digest()
+    return str(sum(len(str(number)) for number in range(150_000)))
+
+
+def subprocess_calibration(_code):
+    """Spawning Ruff without work, to cancel out the machine's process startup cost."""
+    return subprocess.run(["ruff", "--version"], capture_output=True, check=True).stdout
+
+
+def calibration_of(configuration):
+    """The calibration workload normalizing `configuration`'s times."""
+    return "calibration" if BACKENDS[configuration.backend].in_process else "subprocess_calibration"
+
+
+def python_version():
+    return ".".join(platform.python_version_tuple()[:2])
+
+
+def measure_rounds(runs, codes, rounds, warmup):
+    """Time `runs` (`{name: function}`) over all `codes`, interleaved, returning `{name: [seconds]}`."""
+    samples = {name: [] for name in runs}
+    for round_index in range(warmup + rounds):
+        for name, run in runs.items():
+            clear_tool_caches()
+            start = time.perf_counter()
+            for code in codes:
+                run(code)
+            if round_index >= warmup:
+                samples[name].append(time.perf_counter() - start)
+    return samples
+
+
+def statistics_of(samples):
+    median = statistics.median(samples)
+    return {"median_seconds": median, "mad_seconds": statistics.median(abs(sample - median) for sample in samples)}
+
+
+def configuration_runs(configurations):
+    runs = {"calibration": calibration, "subprocess_calibration": subprocess_calibration}
+    for configuration in configurations:
+        run = BACKENDS[configuration.backend].run
+        runs[configuration.name] = lambda code, run=run, args=configuration.args: run(code, *args)
+    return runs
+
+
+def update_baseline(configurations, codes, baseline_path, repeat, warmup):
+    samples = measure_rounds(configuration_runs(configurations), codes, repeat, warmup)
+    baseline = {
+        "inputs": [str(path.relative_to(path.parent.parent)) for path in REFERENCE_INPUTS],
+        "python": python_version(),
+        "machine": platform.machine(),
+        "calibration": statistics_of(samples.pop("calibration")),
+        "subprocess_calibration": statistics_of(samples.pop("subprocess_calibration")),
+        "configurations": {
+            configuration.name: {
+                **statistics_of(samples[configuration.name]),
+                "versions": BACKENDS[configuration.backend].fingerprint(),
+            }
+            for configuration in configurations
+        },
+    }
+    if baseline_path.exists():
+        # Keep the baselines of configurations that were not measured this time
+        previous = json.loads(baseline_path.read_text())["configurations"]
+        baseline["configurations"] = {**previous, **baseline["configurations"]}
+    baseline_path.write_text(json.dumps(baseline, indent=2) + "\n")
+    print(f"💾 Saved the baseline of {len(configurations)} configuration(s) to {baseline_path}")
+
+
+def baseline_mismatches(configurations, baseline):
+    """What differs between the environment `baseline` was recorded in and this one."""
+    mismatches = []
+    if "subprocess_calibration" not in baseline:
+        mismatches.append("the baseline predates the subprocess calibration")
+    for key, current in (("python", python_version()), ("machine", platform.machine())):
+        if baseline.get(key) != current:
+            mismatches.append(f"{key}: baseline {baseline.get(key)}, now {current}")
+    for configuration in configurations:
+        recorded = baseline["configurations"][configuration.name]["versions"]
+        current = BACKENDS[configuration.backend].fingerprint()
+        if recorded != current:
+            mismatches.append(f"{configuration.name}: baseline {recorded}, now {current}")
+    return mismatches
+
+
+def compare(configurations, codes, baseline, repeat, warmup):
+    """Return the calibration scales and `{name: (expected, median, ratio, noise)}`, expected times being normalized."""
+    samples = measure_rounds(configuration_runs(configurations), codes, repeat, warmup)
+    scales = {name: statistics.median(samples.pop(name)) / baseline[name]["median_seconds"]
+              for name in ("calibration", "subprocess_calibration")}
+    results = {}
+    for configuration in configurations:
+        recorded = baseline["configurations"][configuration.name]
+        scale = scales[calibration_of(configuration)]
+        expected = recorded["median_seconds"] * scale
+        current = statistics_of(samples[configuration.name])
+        noise = NOISE_MADS * (recorded["mad_seconds"] * scale + current["mad_seconds"])
+        results[configuration.name] = (expected, current["median_seconds"], current["median_seconds"] / expected, noise)
+    return scales, results
+
+
+def is_regression(result, threshold, min_delta):
+    expected, median, ratio, noise = result
+    return ratio > 1 + threshold and median - expected > max(min_delta, noise)
+
+
+def main(configurations, baseline_path=BASELINE, update=False, repeat=DEFAULT_REPEAT, warmup=2,
+         threshold=DEFAULT_THRESHOLD, min_delta=DEFAULT_MIN_DELTA, skip_without_baseline=False):
+    if not update and not baseline_path.exists() and skip_without_baseline:
+        print(f"⏭️ No performance baseline at {baseline_path}, skipping the check")
+        print("Record one with the 'Record performance baseline' workflow in CI, and commit its artifact.")
+        return
+    codes = [path.read_text() for path in REFERENCE_INPUTS]
+    print(f"⏱️ Measuring {len(configurations)} configuration(s) on {len(codes)} reference input(s)"
+          f" ({warmup} warmup, {repeat} interleaved rounds)")
+    if update:
+        update_baseline(configurations, codes, baseline_path, repeat, warmup)
+        return
+
+    if not baseline_path.exists():
+        print(f"❌ No performance baseline at {baseline_path}")
+        print("Run 'make update-performance-baseline' to record one.")
+        sys.exit(1)
+    baseline = json.loads(baseline_path.read_text())
+    missing = [configuration.name for configuration in configurations
+               if configuration.name not in baseline["configurations"]]
+    if missing:
+        print(f"❌ No baseline for: {', '.join(missing)}")
+        print("Run 'make update-performance-baseline' to record one.")
+        sys.exit(1)
+    mismatches = baseline_mismatches(configurations, baseline)
+    if mismatches:
+        print("❌ The baseline was recorded in another environment, its timings don't apply here:")
+        for mismatch in mismatches:
+            print(f"  ❌ {mismatch}")
+        print()
+        print("Record it again where it is checked, e.g. with the 'Record performance baseline' workflow in CI.")
+        sys.exit(1)
+
+    scales, results = compare(configurations, codes, baseline, repeat, warmup)
+    print(f"🧮 This machine runs the calibration workloads at {1 / scales['calibration']:.2f}x (CPU) and "
+          f"{1 / scales['subprocess_calibration']:.2f}x (Ruff startup) the baseline's speed")
+    suspects = [configuration for configuration in configurations
+                if is_regression(results[configuration.name], threshold, min_delta)]
+    if suspects:
+        print(f"🔁 Measuring {', '.join(configuration.name for configuration in suspects)} again to confirm")
+        _, confirmations = compare(suspects, codes, baseline, repeat * 2, warmup)
+        results.update(confirmations)
+
+    regressions = []
+    print()
+    print(f"   {'Configuration':<28} {'expected':>11} {'median':>11} {'ratio':>7}")
+    for configuration in configurations:
+        result = results[configuration.name]
+        expected, median, ratio, _ = result
+        regressed = is_regression(result, threshold, min_delta)
+        status = "❌" if regressed else "✅"
+        print(f"{status} {configuration.name:<28} {expected * 1000:9.1f}ms {median * 1000:9.1f}ms {ratio:6.2f}x")
+        if regressed:
+            regressions.append(f"  ❌ {configuration.name}: {ratio:.2f}x the baseline")
+
+    print()
+    if regressions:
+        print(f"❌ {len(regressions)} configuration(s) regressed by more than {threshold:.0%}:")
+        for regression in regressions:
+            print(regression)
+        print()
+        print("If the slowdown is expected, run 'make update-performance-baseline' to accept it.")
+        sys.exit(1)
+    print(f"✅ No configuration regressed by more than {threshold:.0%}!")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="record the baseline instead of checking it")
+    parser.add_argument("--baseline", metavar="PATH", type=Path, default=BASELINE,
+                        help="baseline file (default: test_files/performance_baseline.json)")
+    parser.add_argument("--skip-without-baseline", action="store_true",
+                        help="succeed without checking anything when there is no baseline file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"fail above this relative slowdown (default: {DEFAULT_THRESHOLD}, i.e. 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA * 1000,
+                        help=f"ignore slowdowns smaller than this (default: {DEFAULT_MIN_DELTA * 1000:g})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"measured rounds (default: {DEFAULT_REPEAT})")
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured rounds first (default: 2)")
+    add_selection_arguments(parser)
+    args = parser.parse_args()
+    configurations = parse_selection(parser, args)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    main(configurations, args.baseline, update=args.update, repeat=args.repeat, warmup=args.warmup,
+         threshold=args.threshold, min_delta=args.min_delta_ms / 1000,
+         skip_without_baseline=args.skip_without_baseline)
@@ -0,0 +1,18 @@
+import pytest
+
+from benchmark_configurations import percentile
+
+
+@pytest.mark.parametrize("samples, fraction, expected", [
+    (range(1, 21), 0.95, 19),
+    (range(1, 101), 0.95, 95),
+    (range(1, 101), 0.5, 50),
+    (range(1, 11), 0.95, 10),
+    (range(1, 6), 0.95, 5),
+    ([3.0], 0.95, 3.0),
+    ([2, 1], 0.5, 1),
+    ([5, 1, 4, 2, 3], 0.0, 1),
+    ([5, 1, 4, 2, 3], 1.0, 5),
+])
+def test_percentile_is_nearest_rank(samples, fraction, expected):
+    assert percentile(list(samples), fraction) == expected
@@ -0,0 +1,16 @@
+import extract_shed_inputs
+
+
+def test_force_removes_inputs_without_a_recorded_file(tmp_path):
+    recorded, target = tmp_path / "recorded", tmp_path / "inputs"
+    recorded.mkdir()
+    (recorded / "kept.txt").write_text("import os\n" + extract_shed_inputs.JOINER + "output\n")
+    (recorded / "gone.txt").write_text("import sys\n")
+    extract_shed_inputs.extract_inputs(recorded, target)
+    (recorded / "gone.txt").unlink()
+    (target / "stale.py").write_text("x = 1\n")  # From a manifest that was since lost
+
+    extract_shed_inputs.extract_inputs(recorded, target, force=True)
+
+    assert sorted(path.name for path in target.iterdir()) == [".manifest.json", "kept.py"]
+    assert (target / "kept.py").read_text() == "import os\n"
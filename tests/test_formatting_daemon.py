@@ -0,0 +1,25 @@
+import json
+
+import formatting_daemon
+
+
+def serve(*lines):
+    responses = []
+    shutdown = formatting_daemon.serve_lines([f"{line}\n" for line in lines], responses.append)
+    return shutdown, [json.loads(response) for response in responses]
+
+
+def test_invalid_requests_get_error_responses():
+    shutdown, responses = serve("{", "[1]", '"x"', '{"id": 1, "configuration": ["black_only"]}')
+    assert not shutdown
+    assert [response["output"] for response in responses] == [None] * 4
+    assert responses[0]["error"].startswith("Invalid JSON")
+    assert responses[1]["error"] == responses[2]["error"] == "Invalid request, expected a JSON object"
+    assert responses[3]["id"] == 1 and responses[3]["error"].startswith("Unknown configuration")
+
+
+def test_requests_after_an_invalid_one_are_answered():
+    shutdown, responses = serve("[1]", json.dumps({"id": 2, "configuration": "black_only", "input": "x  =  1\n"}),
+                                '{"command": "shutdown"}')
+    assert shutdown
+    assert responses[1] == {**responses[1], "id": 2, "output": "x = 1\n", "error": None}
@@ -0,0 +1,39 @@
+import shutil
+
+import pytest
+
+from compare_configurations import stream_corpus
+from configurations import select_configurations
+
+pytestmark = pytest.mark.skipif(shutil.which("ruff") is None, reason="ruff is not installed")
+
+CORPUS = {
+    "clean.py": "x = 1\n",
+    "unformatted.py": "import os\nimport sys\ndef f( a,b ):\n  unused = 1\n  return a+b\n",
+    "nested/imports.py": "import sys, os\nfrom typing import List\nprint(sys.argv)\n",
+    "broken.py": "def f(:\n    return\n",
+    "unicode.py": "s = 'héllo 🎉'  ;  import os\n",
+}
+
+
+def run(files, batch_size):
+    configurations = select_configurations(["ruff_format", "ruff_fix"])
+    return {path.name: (outputs, errors) for path, outputs, errors, _, _ in
+            stream_corpus(files, configurations, batch_size=batch_size)}
+
+
+def test_batched_outputs_match_per_file_outputs(tmp_path):
+    for name, code in CORPUS.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(code)
+    files = sorted(tmp_path / name for name in CORPUS)
+
+    per_file = run(files, batch_size=0)
+    for batch_size in (2, 256):
+        assert run(files, batch_size=batch_size) == per_file
+
+    # Over stdin, `ruff format` gives an empty output for an input it can't parse
+    outputs, errors = per_file["broken.py"]
+    assert outputs["ruff_format_only"] == ""
+    assert errors["ruff_format_only"] is None
+    assert per_file["unformatted.py"][0]["ruff_format_only"] != CORPUS["unformatted.py"]
@@ -0,0 +1,39 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import subprocess_usage
+
+pytestmark = pytest.mark.skipif(sys.platform != "linux", reason="checks Linux's fork+exec RSS accounting")
+
+MB = 2**20
+
+
+def child_usage(code):
+    with subprocess_usage.collect_usage() as usages:
+        subprocess_usage.run([sys.executable, "-c", code], check=True)
+    (usage,) = usages
+    return usage
+
+
+def test_peak_rss_is_the_child_own():
+    ballast = b"x" * (512 * MB)  # Inherited by any child forked from this process
+    usage = child_usage("data = b'x' * (64 * 2**20)")
+    assert 64 * MB <= usage["peak_rss_bytes"] < 256 * MB
+    del ballast
+
+
+
+def test_concurrent_runs():
+    codes = [f"print({index})" for index in range(8)]
+    with ThreadPoolExecutor(len(codes)) as executor:
+        results = executor.map(
+            lambda code: subprocess_usage.run([sys.executable, "-c", code], capture_output=True, text=True), codes)
+        assert [result.stdout for result in results] == [f"{index}\n" for index in range(8)]
+
+
+def test_exit_status_and_errors():
+    assert subprocess_usage.run([sys.executable, "-c", "raise SystemExit(3)"]).returncode == 3
+    with pytest.raises(FileNotFoundError):
+        subprocess_usage.run(["linter-explorer-missing-command"])